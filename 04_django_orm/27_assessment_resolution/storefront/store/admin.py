@@ -1,3 +1,14 @@
 from django.contrib import admin
+from .models import City, CityAlias
 
-# Register your models here.
+
+class CityAliasInline(admin.TabularInline):
+    model = CityAlias
+    extra = 1
+
+
+@admin.register(City)
+class CityAdmin(admin.ModelAdmin):
+    list_display = ['name', 'key']
+    search_fields = ['key']
+    inlines = [CityAliasInline]
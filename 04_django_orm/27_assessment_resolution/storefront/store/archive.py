@@ -0,0 +1,150 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum
+from django.utils import timezone
+
+from .models import (ArchivedCustomerTotals, ArchivedOrder, ArchivedOrderItem,
+                     ArchivedProductTotals, Order, OrderItem)
+
+
+ORDER_FIELDS = ('id', 'placed_at', 'payment_status', 'customer_id')
+ORDER_ITEM_FIELDS = ('id', 'order_id', 'product_id', 'quantity', 'price')
+
+
+def archive_cutoff(days=None):
+    if days is None:
+        days = getattr(settings, 'STORE_ORDER_ARCHIVE_DAYS', 365)
+    return timezone.now() - timedelta(days=days)
+
+
+def archivable_order_ids(cutoff, chunk_size):
+    """
+    Yield lists of completed order ids placed before cutoff, in id order.
+
+    Every chunk is deleted from the live table before the next one is
+    fetched, so the same "first chunk_size rows" query walks the backlog.
+    """
+    queryset = Order.objects.filter(
+        payment_status=Order.PAYMENT_STATUS_COMPLETE,
+        placed_at__lt=cutoff,
+    ).order_by('id').values_list('id', flat=True)
+
+    while True:
+        ids = list(queryset[:chunk_size])
+        if not ids:
+            return
+        yield ids
+
+
+def _add_customer_totals(order_ids):
+    rows = Order.objects.filter(id__in=order_ids).values('customer_id').annotate(
+        order_count=Count('id', distinct=True),
+        last_order_id=Max('id'),
+        last_order_at=Max('placed_at'),
+        total_spent=Sum(F('orderitem__quantity') * F('orderitem__price')),
+    )
+    rows = {row['customer_id']: row for row in rows}
+    existing = ArchivedCustomerTotals.objects.select_for_update().in_bulk(
+        list(rows))
+
+    created, updated = [], []
+    for customer_id, row in rows.items():
+        totals = existing.get(customer_id)
+        if totals is None:
+            totals = ArchivedCustomerTotals(customer_id=customer_id)
+            created.append(totals)
+        else:
+            updated.append(totals)
+        totals.order_count += row['order_count']
+        totals.last_order_id = max(
+            totals.last_order_id or 0, row['last_order_id'])
+        totals.last_order_at = max(
+            filter(None, [totals.last_order_at, row['last_order_at']]))
+        totals.total_spent += row['total_spent'] or 0
+
+    ArchivedCustomerTotals.objects.bulk_create(created)
+    ArchivedCustomerTotals.objects.bulk_update(
+        updated, ['order_count', 'last_order_id', 'last_order_at', 'total_spent'])
+
+
+def _add_product_totals(order_ids):
+    rows = OrderItem.objects.filter(order_id__in=order_ids).values('product_id').annotate(
+        total_quantity=Sum('quantity'),
+        total_sales=Sum(F('quantity') * F('price')),
+    )
+    rows = {row['product_id']: row for row in rows}
+    existing = ArchivedProductTotals.objects.select_for_update().in_bulk(
+        list(rows))
+
+    created, updated = [], []
+    for product_id, row in rows.items():
+        totals = existing.get(product_id)
+        if totals is None:
+            totals = ArchivedProductTotals(product_id=product_id)
+            created.append(totals)
+        else:
+            updated.append(totals)
+        totals.total_quantity += row['total_quantity']
+        totals.total_sales += row['total_sales']
+
+    ArchivedProductTotals.objects.bulk_create(created)
+    ArchivedProductTotals.objects.bulk_update(
+        updated, ['total_quantity', 'total_sales'])
+
+
+def archive_orders(days=None, chunk_size=500):
+    """
+    Move completed orders older than the cutoff, with their items, into the
+    archive tables and roll their totals into the archived summaries.
+
+    Each chunk is copied, summarised and deleted in one transaction, so the
+    live aggregates plus the archived summaries always add up to the full
+    history. Original primary keys are kept. Returns the number of orders
+    archived.
+    """
+    cutoff = archive_cutoff(days)
+    archived = 0
+
+    for ids in archivable_order_ids(cutoff, chunk_size):
+        with transaction.atomic():
+            live_orders = Order.objects.filter(id__in=ids)
+            live_items = OrderItem.objects.filter(order_id__in=ids)
+
+            _add_customer_totals(ids)
+            _add_product_totals(ids)
+
+            ArchivedOrder.objects.bulk_create(
+                ArchivedOrder(**row) for row in live_orders.values(*ORDER_FIELDS))
+            ArchivedOrderItem.objects.bulk_create(
+                ArchivedOrderItem(**row) for row in live_items.values(*ORDER_ITEM_FIELDS))
+
+            live_items.delete()
+            live_orders.delete()
+        archived += len(ids)
+
+    return archived
+
+
+def order_history(include_archived=False, **filters):
+    """
+    Return order rows as dictionaries, optionally including archived orders.
+
+    The archived half is combined with UNION ALL, so the result can be
+    ordered and sliced but not filtered further; pass filters here instead.
+    """
+    live = Order.objects.filter(**filters).values(*ORDER_FIELDS)
+    if not include_archived:
+        return live
+    archived = ArchivedOrder.objects.filter(**filters).values(*ORDER_FIELDS)
+    return live.union(archived, all=True)
+
+
+def order_item_history(include_archived=False, **filters):
+    live = OrderItem.objects.filter(**filters).values(*ORDER_ITEM_FIELDS)
+    if not include_archived:
+        return live
+    archived = ArchivedOrderItem.objects.filter(
+        **filters).values(*ORDER_ITEM_FIELDS)
+    return live.union(archived, all=True)
@@ -0,0 +1,139 @@
+import re
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+DEFAULTS = {
+    'ENABLED': False,
+    'SAMPLE_RATE': 0.01,
+    'BUFFER_SIZE': 500,
+    'CACHE': 'default',
+    'DUPLICATE_THRESHOLD': 2,
+}
+
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*%s\s*,?)+\)', re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SPACE = re.compile(r'\s+')
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'QUERY_INSTRUMENTATION', {})}
+
+
+def fingerprint(sql):
+    """
+    Reduce a query to its shape so repeated lookups with different values
+    (the classic N+1 pattern) compare equal.
+    """
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper that keeps running totals for one request.
+
+    Only the parameterized SQL is kept, never the parameters, so no customer
+    data ends up in the buffer.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_sql = None
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.total_time += duration
+            if duration >= self.slowest_time:
+                self.slowest_time = duration
+                self.slowest_sql = sql
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self, threshold):
+        return [(sql, count) for sql, count in self.fingerprints.most_common()
+                if count >= threshold]
+
+
+class RingBuffer:
+    """
+    Fixed-size buffer of recent samples kept in a Django cache.
+
+    A shared cache backend (file, database, memcached, redis) lets the admin
+    page and the query_stats command see samples from every worker; with the
+    local-memory backend each process only sees its own.
+    """
+
+    def __init__(self, cache_alias, size):
+        self.cache = caches[cache_alias]
+        self.size = size
+        self.prefix = 'query_instrumentation'
+
+    def _slot_key(self, slot):
+        return f'{self.prefix}:slot:{slot}'
+
+    def append(self, entry):
+        head_key = f'{self.prefix}:head'
+        self.cache.add(head_key, 0, timeout=None)
+        try:
+            seq = self.cache.incr(head_key)
+        except ValueError:
+            self.cache.set(head_key, 1, timeout=None)
+            seq = 1
+        entry['seq'] = seq
+        self.cache.set(self._slot_key(seq % self.size), entry, timeout=None)
+
+    def entries(self):
+        keys = [self._slot_key(slot) for slot in range(self.size)]
+        return sorted(self.cache.get_many(keys).values(),
+                      key=lambda entry: entry['seq'], reverse=True)
+
+    def clear(self):
+        self.cache.delete_many(
+            [f'{self.prefix}:head'] + [self._slot_key(slot) for slot in range(self.size)])
+
+
+def get_buffer(config=None):
+    config = config or get_config()
+    return RingBuffer(config['CACHE'], config['BUFFER_SIZE'])
+
+
+def summarize(entries):
+    """
+    Group samples by view, slowest average database time first.
+    """
+    views = {}
+    for entry in entries:
+        view = views.setdefault(entry['view'], {
+            'view': entry['view'],
+            'samples': 0,
+            'queries': 0,
+            'db_time_ms': 0.0,
+            'max_db_time_ms': 0.0,
+            'duplicate_samples': 0,
+        })
+        view['samples'] += 1
+        view['queries'] += entry['query_count']
+        view['db_time_ms'] += entry['db_time_ms']
+        view['max_db_time_ms'] = max(
+            view['max_db_time_ms'], entry['db_time_ms'])
+        if entry['duplicates']:
+            view['duplicate_samples'] += 1
+
+    for view in views.values():
+        view['avg_queries'] = view['queries'] / view['samples']
+        view['avg_db_time_ms'] = view['db_time_ms'] / view['samples']
+    return sorted(views.values(), key=lambda view: view['avg_db_time_ms'], reverse=True)
@@ -0,0 +1,88 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import (Case, F, FloatField, IntegerField, Q, Sum, Value,
+                              When)
+from django.db.models.functions import Cast, Ceil, Coalesce
+from django.utils import timezone
+
+from .models import (LOW_STOCK_THRESHOLD, InventorySnapshot, Order, OrderItem,
+                     Product, StockMovement)
+
+
+def place_order(customer, lines):
+    """
+    Create an order from (product, quantity) pairs, take the stock and record
+    the movements, all in one transaction.
+
+    Inventory is decremented with a single UPDATE ... CASE statement however
+    many lines the order has.
+    """
+    quantities = {}
+    for product, quantity in lines:
+        quantities[product.id] = quantities.get(product.id, 0) + quantity
+
+    with transaction.atomic():
+        order = Order.objects.create(customer=customer)
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, product=product,
+                      quantity=quantity, price=product.price)
+            for product, quantity in lines
+        )
+        Product.objects.filter(id__in=quantities).update(inventory=F('inventory') - Case(
+            *[When(id=product_id, then=Value(quantity))
+              for product_id, quantity in quantities.items()],
+            output_field=IntegerField(),
+        ))
+        StockMovement.objects.bulk_create(
+            StockMovement(product_id=product_id, quantity=-quantity,
+                          reason=StockMovement.REASON_ORDER, order=order)
+            for product_id, quantity in quantities.items()
+        )
+    return order
+
+
+def low_stock_products():
+    # A range scan on store_product_inventory_idx.
+    return Product.objects.filter(inventory__lt=LOW_STOCK_THRESHOLD)
+
+
+def take_snapshot(batch_size=1000):
+    """
+    Record the current inventory of every product under one timestamp.
+    """
+    taken_at = timezone.now()
+    rows = Product.objects.values_list('id', 'inventory').iterator(
+        chunk_size=batch_size)
+    batch = []
+    count = 0
+    for product_id, inventory in rows:
+        batch.append(InventorySnapshot(
+            product_id=product_id, inventory=inventory, taken_at=taken_at))
+        if len(batch) == batch_size:
+            InventorySnapshot.objects.bulk_create(batch)
+            count += len(batch)
+            batch = []
+    InventorySnapshot.objects.bulk_create(batch)
+    return count + len(batch)
+
+
+def reorder_suggestions(window_days=30, cover_days=14):
+    """
+    Products whose stock will not cover the next cover_days at the sales
+    velocity of the last window_days, with the quantity to reorder.
+
+    Velocity, projected demand and the shortfall are all computed by the
+    database in one grouped query.
+    """
+    since = timezone.now() - timedelta(days=window_days)
+    recent = Q(orderitem__order__placed_at__gte=since)
+    return Product.objects.annotate(
+        units_sold=Coalesce(Sum('orderitem__quantity', filter=recent), 0),
+    ).annotate(
+        reorder_quantity=Cast(
+            Ceil(Cast('units_sold', FloatField()) * cover_days / window_days),
+            IntegerField(),
+        ) - F('inventory'),
+    ).filter(reorder_quantity__gt=0).order_by('-reorder_quantity').values(
+        'id', 'title', 'inventory', 'units_sold', 'reorder_quantity')
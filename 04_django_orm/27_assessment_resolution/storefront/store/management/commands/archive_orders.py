@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from store.archive import archive_orders
+
+
+class Command(BaseCommand):
+    help = 'Move completed orders older than the cutoff into the archive tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Archive orders placed more than this many days ago '
+                                 '(defaults to STORE_ORDER_ARCHIVE_DAYS or 365).')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Number of orders moved per transaction.')
+
+    def handle(self, *args, **options):
+        archived = archive_orders(
+            days=options['days'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} orders.'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from store.inventory import low_stock_products, reorder_suggestions
+from store.models import LOW_STOCK_THRESHOLD
+
+
+class Command(BaseCommand):
+    help = 'List low-stock products and reorder suggestions based on recent sales.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window-days', type=int, default=30,
+                            help='Number of days of order history used for sales velocity.')
+        parser.add_argument('--cover-days', type=int, default=14,
+                            help='Number of days of sales the stock should cover.')
+
+    def handle(self, *args, **options):
+        low_stock = low_stock_products().values_list('id', 'title', 'inventory')
+        self.stdout.write(f'Products below {LOW_STOCK_THRESHOLD} in stock:')
+        for product_id, title, inventory in low_stock:
+            self.stdout.write(self.style.WARNING(f'  #{product_id} {title}: {inventory}'))
+
+        self.stdout.write('Reorder suggestions:')
+        for product in reorder_suggestions(options['window_days'], options['cover_days']):
+            self.stdout.write(
+                f'  #{product["id"]} {product["title"]}: {product["inventory"]} in stock, '
+                f'{product["units_sold"]} sold, reorder {product["reorder_quantity"]}')
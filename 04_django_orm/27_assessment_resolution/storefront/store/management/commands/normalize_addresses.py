@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from store.normalization import normalize_addresses
+
+
+class Command(BaseCommand):
+    help = 'Link addresses to canonical cities from the City reference table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Reprocess every address instead of only new or changed ones.')
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Number of addresses loaded and updated per batch.')
+
+    def handle(self, *args, **options):
+        processed, unmatched = normalize_addresses(
+            incremental=not options['full'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Normalized {processed} addresses, {unmatched} without a matching city.'))
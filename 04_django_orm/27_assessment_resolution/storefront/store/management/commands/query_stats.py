@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from store.instrumentation import get_buffer, summarize
+
+
+class Command(BaseCommand):
+    help = 'Show per-view query statistics recorded by QueryInstrumentationMiddleware.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--slowest', type=int, default=5,
+                            help='Number of slowest individual samples to show.')
+        parser.add_argument('--clear', action='store_true',
+                            help='Empty the buffer after printing.')
+
+    def handle(self, *args, **options):
+        buffer = get_buffer()
+        entries = buffer.entries()
+        if not entries:
+            self.stdout.write('No samples recorded.')
+            return
+
+        self.stdout.write(f'{"view":40} {"samples":>8} {"avg q":>7} {"avg ms":>9} {"max ms":>9} {"dup":>5}')
+        for view in summarize(entries):
+            self.stdout.write(
+                f'{view["view"][:40]:40} {view["samples"]:>8} {view["avg_queries"]:>7.1f} '
+                f'{view["avg_db_time_ms"]:>9.2f} {view["max_db_time_ms"]:>9.2f} {view["duplicate_samples"]:>5}')
+
+        self.stdout.write('')
+        slowest = sorted(entries, key=lambda entry: entry['db_time_ms'], reverse=True)
+        for entry in slowest[:options['slowest']]:
+            self.stdout.write(self.style.WARNING(
+                f'{entry["method"]} {entry["view"]}: {entry["query_count"]} queries, '
+                f'{entry["db_time_ms"]:.2f} ms'))
+            self.stdout.write(f'  slowest ({entry["slowest_ms"]:.2f} ms): {entry["slowest_sql"]}')
+            for sql, count in entry['duplicates']:
+                self.stdout.write(f'  {count}x {sql}')
+
+        if options['clear']:
+            buffer.clear()
+            self.stdout.write(self.style.SUCCESS('Buffer cleared.'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from store.rfm import score_customers
+
+
+class Command(BaseCommand):
+    help = 'Recompute RFM scores for every customer and apply membership upgrades.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Number of customers loaded and updated per batch.')
+        parser.add_argument('--days', type=int, default=None,
+                            help='Only count orders placed in the last this many days '
+                                 '(defaults to the whole order history).')
+
+    def handle(self, *args, **options):
+        scored, upgraded = score_customers(
+            chunk_size=options['chunk_size'], days=options['days'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Scored {scored} customers, upgraded {upgraded} memberships.'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from store.inventory import take_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Record the current inventory of every product. Meant to be run periodically.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of snapshot rows inserted per query.')
+
+    def handle(self, *args, **options):
+        count = take_snapshot(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Recorded {count} inventory levels.'))
@@ -0,0 +1,56 @@
+import random
+import time
+from contextlib import ExitStack
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .instrumentation import QueryRecorder, get_buffer, get_config
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Record query count, database time, the slowest statement and repeated
+    query shapes for a sample of requests.
+
+    Unlike debug_toolbar this does not need DEBUG: queries are observed
+    through connection.execute_wrapper(). When QUERY_INSTRUMENTATION is
+    disabled the middleware removes itself at startup, and unsampled
+    requests only pay for one random() call.
+    """
+
+    def __init__(self, get_response):
+        config = get_config()
+        if not config['ENABLED'] or config['SAMPLE_RATE'] <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = config['SAMPLE_RATE']
+        self.duplicate_threshold = config['DUPLICATE_THRESHOLD']
+        self.buffer = get_buffer(config)
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = request.resolver_match
+        self.buffer.append({
+            'timestamp': time.time(),
+            'view': match.view_name if match else request.path,
+            'method': request.method,
+            'status': response.status_code,
+            'response_time_ms': elapsed * 1000,
+            'query_count': recorder.count,
+            'db_time_ms': recorder.total_time * 1000,
+            'slowest_sql': recorder.slowest_sql,
+            'slowest_ms': recorder.slowest_time * 1000,
+            'duplicates': recorder.duplicates(self.duplicate_threshold),
+        })
+        return response
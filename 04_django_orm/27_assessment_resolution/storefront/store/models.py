@@ -1,3 +1,6 @@
+import re
+import unicodedata
+
 from django.db import models
 
 
@@ -12,6 +15,10 @@ class Collection(models.Model):
         'Product', null=True, on_delete=models.SET_NULL, related_name='collections')
 
 
+# Products below this inventory level are reported as low stock.
+LOW_STOCK_THRESHOLD = 10
+
+
 class Product(models.Model):
     title = models.CharField(max_length=255)
     slug = models.SlugField(db_default='-')
@@ -22,6 +29,14 @@ class Product(models.Model):
     collection = models.ForeignKey(Collection, on_delete=models.CASCADE)
     promotions = models.ManyToManyField(Promotion)
 
+    class Meta:
+        indexes = [
+            # A plain index: MySQL has no partial indexes and would silently
+            # skip a conditional one. The low-stock check is a range scan on
+            # the small low end of it rather than a scan of every product.
+            models.Index(fields=['inventory'], name='store_product_inventory_idx'),
+        ]
+
 
 class Customer(models.Model):
     MEMBERSHIP_BRONZE = 'B'
@@ -40,12 +55,54 @@ class Customer(models.Model):
     birth_date = models.DateField(null=True)
     membership = models.CharField(
         max_length=1, choices=MEMBERSHIP_CHOICES, default=MEMBERSHIP_BRONZE)
+    recency_score = models.PositiveSmallIntegerField(null=True)
+    frequency_score = models.PositiveSmallIntegerField(null=True)
+    monetary_score = models.PositiveSmallIntegerField(null=True)
+    rfm_scored_at = models.DateTimeField(null=True)
+
+
+class City(models.Model):
+    name = models.CharField(max_length=255)
+    key = models.CharField(max_length=255, unique=True, editable=False)
+
+    def __str__(self):
+        return self.name
+
+    @staticmethod
+    def make_key(name):
+        """
+        Fold a free-form city name to its lookup key: accents stripped, case
+        folded, punctuation dropped and whitespace collapsed, so
+        " São  Paulo." and "sao paulo" share a key.
+        """
+        name = unicodedata.normalize('NFKD', name)
+        name = ''.join(char for char in name if not unicodedata.combining(char))
+        name = re.sub(r'[^\w\s]', ' ', name.casefold())
+        return re.sub(r'\s+', ' ', name).strip()
+
+    def save(self, *args, **kwargs):
+        self.key = self.make_key(self.name)
+        super().save(*args, **kwargs)
+
+
+class CityAlias(models.Model):
+    name = models.CharField(max_length=255)
+    key = models.CharField(max_length=255, unique=True, editable=False)
+    city = models.ForeignKey(City, on_delete=models.CASCADE, related_name='aliases')
+
+    def save(self, *args, **kwargs):
+        self.key = City.make_key(self.name)
+        super().save(*args, **kwargs)
 
 
 class Address(models.Model):
     street = models.CharField(max_length=255)
     city = models.CharField(max_length=255)
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
+    canonical_city = models.ForeignKey(
+        City, null=True, on_delete=models.SET_NULL, related_name='addresses')
+    last_update = models.DateTimeField(auto_now=True)
+    normalized_at = models.DateTimeField(null=True)
 
 
 class Order(models.Model):
@@ -72,6 +129,66 @@ class OrderItem(models.Model):
     price = models.DecimalField(max_digits=7, decimal_places=2)
 
 
+class ArchivedOrder(models.Model):
+    placed_at = models.DateTimeField(db_index=True)
+    payment_status = models.CharField(
+        max_length=1, choices=Order.PAYMENT_STATUS_CHOICES)
+    customer = models.ForeignKey(Customer, on_delete=models.PROTECT)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+
+class ArchivedOrderItem(models.Model):
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.PROTECT)
+    product = models.ForeignKey(Product, on_delete=models.PROTECT)
+    quantity = models.PositiveSmallIntegerField()
+    price = models.DecimalField(max_digits=7, decimal_places=2)
+
+
+class ArchivedCustomerTotals(models.Model):
+    customer = models.OneToOneField(
+        Customer, on_delete=models.CASCADE, primary_key=True, related_name='archived_totals')
+    order_count = models.PositiveIntegerField(default=0)
+    last_order_id = models.BigIntegerField(null=True)
+    last_order_at = models.DateTimeField(null=True)
+    total_spent = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0)
+
+
+class ArchivedProductTotals(models.Model):
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, primary_key=True, related_name='archived_totals')
+    total_quantity = models.PositiveIntegerField(default=0)
+    total_sales = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0)
+
+
+class InventorySnapshot(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    inventory = models.IntegerField()
+    taken_at = models.DateTimeField(db_index=True)
+
+
+class StockMovement(models.Model):
+    REASON_ORDER = 'O'
+    REASON_RESTOCK = 'R'
+    REASON_ADJUSTMENT = 'A'
+
+    REASON_CHOICES = [
+        (REASON_ORDER, 'Order'),
+        (REASON_RESTOCK, 'Restock'),
+        (REASON_ADJUSTMENT, 'Adjustment'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.PROTECT)
+    quantity = models.IntegerField()
+    reason = models.CharField(max_length=1, choices=REASON_CHOICES)
+    # No constraint or cascade: store.archive moves orders out under their
+    # original ids, and the ledger keeps pointing at them in ArchivedOrder.
+    order = models.ForeignKey(Order, null=True, on_delete=models.DO_NOTHING,
+                              db_constraint=False)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+
 class Cart(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
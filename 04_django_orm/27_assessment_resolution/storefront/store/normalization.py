@@ -0,0 +1,62 @@
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Address, City, CityAlias
+
+
+def load_reference():
+    """
+    Map every known key (canonical names and aliases) to a City id.
+
+    The reference table is small compared to Address, so it is read once per
+    run instead of being joined or looked up per address.
+    """
+    reference = dict(CityAlias.objects.values_list('key', 'city_id'))
+    reference.update(City.objects.values_list('key', 'id'))
+    return reference
+
+
+def address_chunks(queryset, chunk_size):
+    last_id = 0
+    queryset = queryset.only('id', 'city', 'canonical_city').order_by('id')
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1].id
+
+
+def normalize_addresses(incremental=True, chunk_size=1000):
+    """
+    Resolve Address.city to a canonical City for every address, or in
+    incremental mode only those created or edited since they were last
+    normalized, plus those that matched nothing so far (the reference
+    table may have gained their city or an alias since).
+
+    Returns the number of addresses processed and how many of them did not
+    match any reference city (those keep canonical_city empty).
+    """
+    now = timezone.now()
+    reference = load_reference()
+    queryset = Address.objects.all()
+    if incremental:
+        queryset = queryset.filter(
+            Q(normalized_at__isnull=True) | Q(canonical_city__isnull=True) |
+            Q(last_update__gt=F('normalized_at')))
+
+    processed = unmatched = 0
+    for chunk in address_chunks(queryset, chunk_size):
+        for address in chunk:
+            address.canonical_city_id = reference.get(
+                City.make_key(address.city))
+            address.normalized_at = now
+            if address.canonical_city_id is None:
+                unmatched += 1
+        with transaction.atomic():
+            Address.objects.bulk_update(
+                chunk, ['canonical_city', 'normalized_at'])
+        processed += len(chunk)
+
+    return processed, unmatched
@@ -0,0 +1,157 @@
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import (Count, DecimalField, F, Max, OuterRef, Q,
+                              Subquery, Sum, Value)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ArchivedOrder, ArchivedOrderItem, Customer, Order
+
+
+# Upper bounds (in days) for recency scores 5, 4, 3 and 2; anything older scores 1.
+RECENCY_DAYS = [30, 90, 180, 365]
+# Lower bounds for frequency and monetary scores 2, 3, 4 and 5.
+FREQUENCY_ORDERS = [2, 4, 8, 16]
+MONETARY_SPEND = [Decimal(100), Decimal(500), Decimal(1000), Decimal(5000)]
+
+# Minimum combined R+F+M score needed for each tier, highest first.
+TIER_THRESHOLDS = [
+    (13, Customer.MEMBERSHIP_GOLD),
+    (10, Customer.MEMBERSHIP_SILVER),
+]
+TIER_RANK = {
+    Customer.MEMBERSHIP_BRONZE: 0,
+    Customer.MEMBERSHIP_SILVER: 1,
+    Customer.MEMBERSHIP_GOLD: 2,
+}
+
+ZERO = Value(0, output_field=DecimalField())
+
+SCORE_FIELDS = ['recency_score', 'frequency_score',
+                'monetary_score', 'rfm_scored_at']
+
+
+def recency_score(last_order_at, now):
+    if last_order_at is None:
+        return 1
+    days = (now - last_order_at).days
+    return 5 - bisect_left(RECENCY_DAYS, days)
+
+
+def frequency_score(order_count):
+    return 1 + bisect_right(FREQUENCY_ORDERS, order_count)
+
+
+def monetary_score(total_spent):
+    return 1 + bisect_right(MONETARY_SPEND, total_spent or 0)
+
+
+def tier_for(total_score):
+    for minimum, tier in TIER_THRESHOLDS:
+        if total_score >= minimum:
+            return tier
+    return Customer.MEMBERSHIP_BRONZE
+
+
+def archived_aggregates(since):
+    """
+    Correlated subqueries for a customer's latest archived order date,
+    archived order count and spend from since on. The archived_totals summaries cover all time, so a
+    window has to read the archive itself (which only holds completed
+    orders).
+    """
+    orders = ArchivedOrder.objects.filter(
+        customer=OuterRef('pk'), placed_at__gte=since).values('customer')
+    items = ArchivedOrderItem.objects.filter(
+        order__customer=OuterRef('pk'), order__placed_at__gte=since).values('order__customer')
+    last_order_at = Subquery(orders.annotate(
+        last=Max('placed_at')).values('last'))
+    order_count = Subquery(orders.annotate(n=Count('id')).values('n'))
+    total_spent = Subquery(items.annotate(
+        total=Sum(F('quantity') * F('price'))).values('total'), output_field=DecimalField())
+    return last_order_at, Coalesce(order_count, 0), Coalesce(total_spent, ZERO)
+
+
+def customer_chunks(chunk_size, since=None):
+    """
+    Yield customers in primary key order, chunk_size at a time, each one
+    annotated with its completed order aggregates, including the orders
+    already moved out by store.archive. With since, only orders placed from
+    then on are counted.
+
+    Chunks are fetched with keyset pagination (id > last seen id) so every
+    query stays an index range scan regardless of how far in we are, and
+    the per-customer aggregates are computed by the database in the same
+    GROUP BY query instead of one query per customer.
+    """
+    complete = Q(order__payment_status=Order.PAYMENT_STATUS_COMPLETE)
+    if since is None:
+        archived_last = F('archived_totals__last_order_at')
+        archived_count = Coalesce('archived_totals__order_count', 0)
+        archived_spent = Coalesce('archived_totals__total_spent', ZERO)
+    else:
+        complete &= Q(order__placed_at__gte=since)
+        archived_last, archived_count, archived_spent = archived_aggregates(
+            since)
+
+    queryset = Customer.objects.only('id', 'membership').annotate(
+        live_last_order_at=Max('order__placed_at', filter=complete),
+        archived_last_order_at=archived_last,
+        order_count=Count('order', filter=complete, distinct=True) +
+        archived_count,
+        total_spent=Coalesce(Sum(
+            F('order__orderitem__quantity') * F('order__orderitem__price'),
+            filter=complete), ZERO) +
+        archived_spent,
+    ).order_by('id')
+
+    last_id = 0
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        for customer in chunk:
+            # Greatest() is NULL on MySQL if either side is, so combine here.
+            customer.last_order_at = max(filter(None, [
+                customer.live_last_order_at, customer.archived_last_order_at]), default=None)
+        yield chunk
+        last_id = chunk[-1].id
+
+
+def score_customers(chunk_size=1000, now=None, days=None):
+    """
+    Recompute recency, frequency and monetary scores for every customer and
+    upgrade memberships whose combined score reaches a higher tier. With
+    days, only orders from the last days days are taken into account.
+
+    Memberships are never downgraded. Returns the number of customers scored
+    and the number of upgrades applied.
+    """
+    now = now or timezone.now()
+    since = None if days is None else now - timedelta(days=days)
+    scored = upgraded = 0
+
+    for chunk in customer_chunks(chunk_size, since):
+        upgrades = {}
+        for customer in chunk:
+            customer.recency_score = recency_score(customer.last_order_at, now)
+            customer.frequency_score = frequency_score(customer.order_count)
+            customer.monetary_score = monetary_score(customer.total_spent)
+            customer.rfm_scored_at = now
+
+            tier = tier_for(customer.recency_score +
+                            customer.frequency_score + customer.monetary_score)
+            if TIER_RANK[tier] > TIER_RANK[customer.membership]:
+                upgrades.setdefault(tier, []).append(customer.id)
+
+        with transaction.atomic():
+            Customer.objects.bulk_update(chunk, SCORE_FIELDS)
+            for tier, ids in upgrades.items():
+                upgraded += Customer.objects.filter(
+                    id__in=ids).update(membership=tier)
+        scored += len(chunk)
+
+    return scored, upgraded
@@ -1,3 +1,335 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.http import HttpResponse
+from django.utils import timezone
+
+from . import rfm
+from .archive import archive_orders
+from .instrumentation import QueryRecorder, RingBuffer, fingerprint, get_buffer
+from .middleware import QueryInstrumentationMiddleware
+from .normalization import normalize_addresses
+from .inventory import (low_stock_products, place_order, reorder_suggestions,
+                        take_snapshot)
+from .models import (Address, ArchivedOrder, City, CityAlias, Collection,
+                     Customer, InventorySnapshot, Order, OrderItem, Product,
+                     StockMovement)
+
+
+class StoreTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.collection = Collection.objects.create(title='Tools')
+        cls.product = Product.objects.create(
+            title='Hammer', description='', inventory=100, collection=cls.collection)
+
+    @classmethod
+    def make_customer(cls, name):
+        return Customer.objects.create(
+            first_name=name, last_name='Test', email=f'{name}@example.com', phone='1')
+
+    @classmethod
+    def make_order(cls, customer, days_ago, amount, status=Order.PAYMENT_STATUS_COMPLETE):
+        order = Order.objects.create(customer=customer, payment_status=status)
+        # placed_at is auto_now_add, so backdate it afterwards.
+        Order.objects.filter(id=order.id).update(
+            placed_at=timezone.now() - timedelta(days=days_ago))
+        OrderItem.objects.create(
+            order=order, product=cls.product, quantity=1, price=Decimal(amount))
+        return order
+
+
+class RFMScoreTests(StoreTestCase):
+    def test_score_boundaries(self):
+        now = timezone.now()
+        self.assertEqual(rfm.recency_score(now - timedelta(days=30), now), 5)
+        self.assertEqual(rfm.recency_score(now - timedelta(days=31), now), 4)
+        self.assertEqual(rfm.recency_score(now - timedelta(days=365), now), 2)
+        self.assertEqual(rfm.recency_score(now - timedelta(days=366), now), 1)
+        self.assertEqual(rfm.recency_score(None, now), 1)
+
+        self.assertEqual(rfm.frequency_score(0), 1)
+        self.assertEqual(rfm.frequency_score(1), 1)
+        self.assertEqual(rfm.frequency_score(2), 2)
+        self.assertEqual(rfm.frequency_score(15), 4)
+        self.assertEqual(rfm.frequency_score(16), 5)
+
+        self.assertEqual(rfm.monetary_score(None), 1)
+        self.assertEqual(rfm.monetary_score(Decimal('99.99')), 1)
+        self.assertEqual(rfm.monetary_score(Decimal(100)), 2)
+        self.assertEqual(rfm.monetary_score(Decimal(5000)), 5)
+
+        self.assertEqual(rfm.tier_for(13), Customer.MEMBERSHIP_GOLD)
+        self.assertEqual(rfm.tier_for(12), Customer.MEMBERSHIP_SILVER)
+        self.assertEqual(rfm.tier_for(9), Customer.MEMBERSHIP_BRONZE)
+
+    def test_customer_without_orders(self):
+        customer = self.make_customer('nobody')
+        self.make_order(customer, 1, 500, status=Order.PAYMENT_STATUS_FAILED)
+
+        self.assertEqual(rfm.score_customers(), (1, 0))
+        customer.refresh_from_db()
+        self.assertEqual(
+            (customer.recency_score, customer.frequency_score, customer.monetary_score), (1, 1, 1))
+        self.assertEqual(customer.membership, Customer.MEMBERSHIP_BRONZE)
+
+    def test_ties_score_the_same_across_chunks(self):
+        first, second = self.make_customer('first'), self.make_customer('second')
+        for customer in (first, second):
+            for _ in range(4):
+                self.make_order(customer, 10, 300)
+
+        self.assertEqual(rfm.score_customers(chunk_size=1), (2, 2))
+        scores = Customer.objects.values_list(
+            'recency_score', 'frequency_score', 'monetary_score', 'membership')
+        # R5 + F3 + M4 = 12 reaches silver.
+        self.assertEqual(list(scores), [(5, 3, 4, Customer.MEMBERSHIP_SILVER)] * 2)
+
+    def test_memberships_are_never_downgraded(self):
+        customer = self.make_customer('gold')
+        Customer.objects.filter(id=customer.id).update(membership=Customer.MEMBERSHIP_GOLD)
+
+        self.assertEqual(rfm.score_customers(), (1, 0))
+        customer.refresh_from_db()
+        self.assertEqual(customer.membership, Customer.MEMBERSHIP_GOLD)
+
+    def test_days_window(self):
+        customer = self.make_customer('window')
+        self.make_order(customer, 10, 60)
+        self.make_order(customer, 200, 60)
+
+        rfm.score_customers()
+        customer.refresh_from_db()
+        self.assertEqual((customer.frequency_score, customer.monetary_score), (2, 2))
+
+        out = StringIO()
+        call_command('score_customers', days=90, stdout=out)
+        self.assertIn('Scored 1 customers, upgraded 0 memberships.', out.getvalue())
+        customer.refresh_from_db()
+        self.assertEqual(
+            (customer.recency_score, customer.frequency_score, customer.monetary_score), (5, 1, 1))
+
+        call_command('score_customers', days=5, stdout=out)
+        customer.refresh_from_db()
+        self.assertEqual(customer.recency_score, 1)
+
+
+class ArchiveTests(StoreTestCase):
+    def test_archived_orders_keep_index_and_recency(self):
+        customer = self.make_customer('archived')
+        pending = self.make_order(customer, 500, 20, status=Order.PAYMENT_STATUS_PENDING)
+        completed = self.make_order(customer, 100, 120)
+        self.assertLess(pending.id, completed.id)
+
+        self.assertEqual(archive_orders(days=30), 1)
+        self.assertFalse(Order.objects.filter(id=completed.id).exists())
+        self.assertEqual(customer.archived_totals.last_order_id, completed.id)
+
+        response = self.client.get('/')
+        self.assertEqual(
+            [row['last_order_id'] for row in response.context['customer']], [completed.id])
+
+        rfm.score_customers()
+        customer.refresh_from_db()
+        # Recency comes from the archived order's date.
+        self.assertEqual(
+            (customer.recency_score, customer.frequency_score, customer.monetary_score), (3, 1, 2))
+
+        # A live completed order newer than the archived one wins.
+        self.make_order(customer, 10, 120)
+        rfm.score_customers()
+        customer.refresh_from_db()
+        self.assertEqual(customer.recency_score, 5)
+
+    def test_window_reads_the_archive(self):
+        customer = self.make_customer('window')
+        self.make_order(customer, 400, 80)
+        self.make_order(customer, 380, 80)
+        archive_orders(days=365)
+
+        rfm.score_customers(days=390)
+        customer.refresh_from_db()
+        self.assertEqual(
+            (customer.recency_score, customer.frequency_score, customer.monetary_score), (1, 1, 1))
+
+        rfm.score_customers(days=500)
+        customer.refresh_from_db()
+        self.assertEqual((customer.frequency_score, customer.monetary_score), (2, 2))
+
+
+@override_settings(
+    CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'instrumentation': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'instrumentation-tests',
+        },
+    },
+    QUERY_INSTRUMENTATION={
+        'ENABLED': True,
+        'SAMPLE_RATE': 1,
+        'BUFFER_SIZE': 5,
+        'CACHE': 'instrumentation',
+        'DUPLICATE_THRESHOLD': 3,
+    },
+)
+class QueryInstrumentationTests(StoreTestCase):
+    def setUp(self):
+        self.buffer = get_buffer()
+        self.buffer.clear()
+
+    def test_ring_buffer_wraps_around(self):
+        for i in range(12):
+            self.buffer.append({'n': i})
+        entries = self.buffer.entries()
+        self.assertEqual([entry['seq'] for entry in entries], [12, 11, 10, 9, 8])
+        self.assertEqual([entry['n'] for entry in entries], [11, 10, 9, 8, 7])
+
+    def test_concurrent_writers_get_distinct_slots(self):
+        buffer = RingBuffer('instrumentation', 100)
+        buffer.clear()
+
+        def write():
+            for _ in range(50):
+                buffer.append({})
+
+        threads = [threading.Thread(target=write) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        entries = buffer.entries()
+        self.assertEqual(buffer.cache.get('query_instrumentation:head'), 400)
+        self.assertEqual(len(entries), 100)
+        self.assertEqual(len({entry['seq'] for entry in entries}), 100)
+        self.assertTrue(all(1 <= entry['seq'] <= 400 for entry in entries))
+
+    def test_duplicate_threshold(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s) AND name = 'x' LIMIT 21"),
+            'SELECT * FROM t WHERE id IN (...) AND name = ? LIMIT ?')
+        recorder = QueryRecorder()
+        recorder.fingerprints.update({'a': 3, 'b': 2, 'c': 1})
+        self.assertEqual(recorder.duplicates(2), [('a', 3), ('b', 2)])
+        self.assertEqual(recorder.duplicates(3), [('a', 3)])
+
+    def test_middleware_records_sampled_request(self):
+        customers = [self.make_customer(name) for name in 'abc']
+
+        def view(request):
+            # An N+1 over three customers and one query below the threshold.
+            for customer in customers:
+                Customer.objects.get(id=customer.id)
+            list(Product.objects.all())
+            return HttpResponse()
+
+        QueryInstrumentationMiddleware(view)(RequestFactory().get('/n-plus-one/'))
+        [entry] = self.buffer.entries()
+        self.assertEqual(entry['view'], '/n-plus-one/')
+        self.assertEqual(entry['query_count'], 4)
+        self.assertEqual(len(entry['duplicates']), 1)
+        self.assertEqual(entry['duplicates'][0][1], 3)
+        self.assertIn('store_customer', entry['duplicates'][0][0])
+
+    def test_disabled_or_unsampled(self):
+        with self.settings(QUERY_INSTRUMENTATION={'ENABLED': False}):
+            with self.assertRaises(MiddlewareNotUsed):
+                QueryInstrumentationMiddleware(HttpResponse)
+        with self.settings(QUERY_INSTRUMENTATION={'ENABLED': True, 'SAMPLE_RATE': 0}):
+            with self.assertRaises(MiddlewareNotUsed):
+                QueryInstrumentationMiddleware(HttpResponse)
+
+
+class NormalizationTests(StoreTestCase):
+    def test_incremental_runs(self):
+        customer = self.make_customer('moves')
+        paulo = City.objects.create(name='São Paulo')
+        lisbon = City.objects.create(name='Lisbon')
+        first = Address.objects.create(street='1 Rua', city=' sao  PAULO.', customer=customer)
+        second = Address.objects.create(street='2 Rua', city='Lisboa', customer=customer)
+
+        self.assertEqual(normalize_addresses(), (2, 1))
+        first.refresh_from_db()
+        self.assertEqual(first.canonical_city, paulo)
+        # Only the unmatched address is looked at again.
+        self.assertEqual(normalize_addresses(), (1, 1))
+
+        # A new alias picks up the address that did not match before.
+        CityAlias.objects.create(name='Lisboa', city=lisbon)
+        self.assertEqual(normalize_addresses(), (1, 0))
+        second.refresh_from_db()
+        self.assertEqual(second.canonical_city, lisbon)
+        self.assertEqual(normalize_addresses(), (0, 0))
+
+        # Edits are picked up; --full reprocesses everything.
+        first.city = 'Lisbon'
+        first.save()
+        out = StringIO()
+        call_command('normalize_addresses', stdout=out)
+        self.assertIn('Normalized 1 addresses, 0 without a matching city.', out.getvalue())
+        first.refresh_from_db()
+        self.assertEqual(first.canonical_city, lisbon)
+        self.assertEqual(normalize_addresses(incremental=False, chunk_size=1), (2, 0))
+
+
+class InventoryTests(StoreTestCase):
+    def test_place_order_takes_stock_and_writes_ledger(self):
+        customer = self.make_customer('buyer')
+        nails = Product.objects.create(
+            title='Nails', description='', inventory=12, collection=self.collection)
+
+        order = place_order(customer, [(self.product, 2), (nails, 3), (self.product, 1)])
+        self.assertEqual(
+            dict(Product.objects.values_list('title', 'inventory')), {'Hammer': 97, 'Nails': 9})
+        self.assertEqual(
+            sorted(StockMovement.objects.values_list('product_id', 'quantity', 'reason', 'order_id')),
+            [(self.product.id, -3, StockMovement.REASON_ORDER, order.id),
+             (nails.id, -3, StockMovement.REASON_ORDER, order.id)])
+        self.assertEqual(list(low_stock_products()), [nails])
+
+        # Archiving the order keeps the ledger's reference to it.
+        Order.objects.filter(id=order.id).update(
+            payment_status=Order.PAYMENT_STATUS_COMPLETE,
+            placed_at=timezone.now() - timedelta(days=400))
+        self.assertEqual(archive_orders(days=365), 1)
+        self.assertEqual(set(StockMovement.objects.values_list('order_id', flat=True)), {order.id})
+        self.assertTrue(ArchivedOrder.objects.filter(id=order.id).exists())
+
+    def test_snapshot_in_batches(self):
+        for i in range(4):
+            Product.objects.create(
+                title=f'P{i}', description='', inventory=i, collection=self.collection)
+
+        with self.assertNumQueries(4):
+            # The product read and inserts of 2, 2 and 1 rows.
+            self.assertEqual(take_snapshot(batch_size=2), 5)
+        self.assertEqual(InventorySnapshot.objects.values('taken_at').distinct().count(), 1)
+        self.assertEqual(
+            InventorySnapshot.objects.get(product=self.product).inventory, 100)
+
+    def test_reorder_suggestions_use_recent_velocity(self):
+        customer = self.make_customer('velocity')
+        fast = Product.objects.create(
+            title='Fast', description='', inventory=5, collection=self.collection)
+        for days_ago in (1, 5, 40):
+            order = self.make_order(customer, days_ago, 1)
+            OrderItem.objects.create(order=order, product=fast, quantity=30, price=1)
+
+        # 60 sold in 30 days, 28 needed for 14 days, 5 in stock.
+        with self.assertNumQueries(1):
+            suggestions = list(reorder_suggestions(window_days=30, cover_days=14))
+        self.assertEqual(suggestions, [{
+            'id': fast.id, 'title': 'Fast', 'inventory': 5,
+            'units_sold': 60, 'reorder_quantity': 23,
+        }])
+
+        out = StringIO()
+        call_command('inventory_report', stdout=out)
+        self.assertIn(f'#{fast.id} Fast: 5', out.getvalue())
+        self.assertIn('reorder 23', out.getvalue())
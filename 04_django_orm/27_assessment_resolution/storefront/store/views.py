@@ -1,17 +1,34 @@
 from django.shortcuts import render
 from .models import Customer, Collection, Product
-from django.db.models import Max, Count, Sum, F
+from .instrumentation import get_buffer, get_config, summarize
+from django.db.models import Max, Count, Sum, F, Value, BigIntegerField, DecimalField
+from django.db.models.functions import Coalesce, Greatest, NullIf
+
+ZERO = Value(0, output_field=DecimalField())
 
 
 def index(request):
-    customer = Customer.objects.annotate(last_order_id=Max(
-        'order__id')).values('id', 'first_name', 'last_order_id')
+    # Orders moved out by store.archive are counted through the archived_totals summaries.
+    # Greatest() is NULL on MySQL if either side is, hence the zeros.
+    customer = Customer.objects.annotate(last_order_id=NullIf(Greatest(Coalesce(Max('order__id'), 0), Coalesce(
+        'archived_totals__last_order_id', 0), output_field=BigIntegerField()), 0)).values('id', 'first_name', 'last_order_id')
     collection = Collection.objects.annotate(product_count=Count(
         'product')).values('id', 'title', 'product_count')
-    customer_more = Customer.objects.annotate(order_count=Count('order')).filter(
+    customer_more = Customer.objects.annotate(order_count=Count('order') + Coalesce('archived_totals__order_count', 0)).filter(
         order_count__gt=5).values('id', 'first_name', 'last_name', 'order_count')
-    customer_spend = Customer.objects.annotate(total_spent=Sum(
-        F('order__orderitem__quantity') * F('order__orderitem__price'))).values('id', 'first_name', 'total_spent')
-    product = Product.objects.annotate(total_quantity=Sum('orderitem__quantity'), total_sales=Sum(
-        F('orderitem__quantity') * F('orderitem__price'))).order_by('-total_quantity')[:5].values('id', 'title', 'total_quantity', 'total_sales')
+    customer_spend = Customer.objects.annotate(total_spent=Coalesce(Sum(
+        F('order__orderitem__quantity') * F('order__orderitem__price')), ZERO) + Coalesce('archived_totals__total_spent', ZERO)).values('id', 'first_name', 'total_spent')
+    product = Product.objects.annotate(total_quantity=Coalesce(Sum('orderitem__quantity'), 0) + Coalesce('archived_totals__total_quantity', 0), total_sales=Coalesce(Sum(
+        F('orderitem__quantity') * F('orderitem__price')), ZERO) + Coalesce('archived_totals__total_sales', ZERO)).order_by('-total_quantity')[:5].values('id', 'title', 'total_quantity', 'total_sales')
     return render(request, 'store/index.html', context={'customer': customer, 'collection': collection, 'customer_more': customer_more, 'customer_spend': customer_spend, 'product': product})
+
+
+def query_stats(request):
+    config = get_config()
+    entries = get_buffer(config).entries()
+    return render(request, 'admin/store/query_stats.html', context={
+        'title': 'Query statistics',
+        'enabled': config['ENABLED'],
+        'views': summarize(entries),
+        'entries': entries[:50],
+    })
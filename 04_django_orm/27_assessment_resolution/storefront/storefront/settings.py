@@ -46,6 +46,7 @@ INTERNAL_IPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'store.middleware.QueryInstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
@@ -90,6 +91,27 @@ DATABASES = {
     }
 }
 
+# Query instrumentation (store.middleware.QueryInstrumentationMiddleware)
+# Samples are kept in a shared file cache so the admin page and the
+# query_stats command can read what every worker recorded.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'instrumentation': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache' / 'instrumentation',
+    },
+}
+
+QUERY_INSTRUMENTATION = {
+    'ENABLED': not DEBUG,
+    'SAMPLE_RATE': 0.05,
+    'BUFFER_SIZE': 500,
+    'CACHE': 'instrumentation',
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
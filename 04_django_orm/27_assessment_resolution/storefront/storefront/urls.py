@@ -16,8 +16,10 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from store.views import query_stats
 
 urlpatterns = [
+    path('admin/query-stats/', admin.site.admin_view(query_stats), name='query_stats'),
     path('admin/', admin.site.urls),
     path('', include('store.urls')),
     path("__debug__/", include("debug_toolbar.urls")),
@@ -1,14 +1,37 @@
 # accounts/admin.py
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
 from .forms import CustomUserCreationForm, CustomUserChangeForm
 from .models import CustomUser
+from .search import SEARCH_FIELDS, estimate_row_count, get_search_config, search_users
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses the table's row estimate instead of COUNT(*) for unfiltered
+    querysets on large tables; filtered ones are counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= get_search_config()["ESTIMATED_COUNT_THRESHOLD"]:
+                return estimate
+        return super().count
 
 class CustomUserAdmin(UserAdmin):
     add_form = CustomUserCreationForm
     form = CustomUserChangeForm
     model = CustomUser
     list_display = ["email", "username", "name", "is_staff"]
+    search_fields = SEARCH_FIELDS
+    paginator = EstimatedCountPaginator
+    # Skip the second, unfiltered COUNT(*) behind "N results (M total)".
+    show_full_result_count = False
     
     # Resetting fieldsets to avoid the usable_password error
     fieldsets = (
@@ -22,4 +45,8 @@ class CustomUserAdmin(UserAdmin):
         }),
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        # Same matching (and indexes) as the API's `?search=`.
+        return search_users(queryset, search_term.split()), False
+
 admin.site.register(CustomUser, CustomUserAdmin)
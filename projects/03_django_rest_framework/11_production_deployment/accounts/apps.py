@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        from . import sessions  # noqa: F401 (registers the session cache check)
+        from .search import create_search_indexes
+
+        post_migrate.connect(create_search_indexes, sender=self)
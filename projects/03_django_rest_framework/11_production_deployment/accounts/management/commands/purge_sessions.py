@@ -0,0 +1,49 @@
+# accounts/management/commands/purge_sessions.py
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.authtoken.models import Token
+
+from accounts.sessions import SessionStore
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired sessions and the tokens of deactivated users in small "
+        "batches, so no statement holds locks for long."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000,
+                            help="Rows deleted per statement.")
+        parser.add_argument("--pause", type=float, default=0.1,
+                            help="Seconds to sleep between batches.")
+
+    def handle(self, *args, **options):
+        self.batch_size = options["batch_size"]
+        self.pause = options["pause"]
+
+        # Every shard's table; cache entries expire on their own.
+        sessions = sum(
+            self.purge(SessionStore.expired_sessions(using)) for using in SessionStore.database_aliases()
+        )
+        # A deactivated user's token can never authenticate again.
+        tokens = self.purge(Token.objects.filter(user__is_active=False))
+        self.stdout.write(f"Deleted {sessions} expired session(s) and {tokens} orphaned token(s).")
+
+    def purge(self, queryset):
+        """
+        Delete `queryset` one batch of primary keys at a time; each DELETE
+        runs in its own short transaction.
+        """
+        deleted = 0
+        while True:
+            pks = list(queryset.values_list("pk", flat=True)[:self.batch_size])
+            if not pks:
+                return deleted
+            # Token deletes send post_delete, which drops them from the auth cache.
+            queryset.model.objects.using(queryset.db).filter(pk__in=pks).delete()
+            deleted += len(pks)
+            if len(pks) < self.batch_size:
+                return deleted
+            time.sleep(self.pause)
@@ -0,0 +1,110 @@
+# accounts/search.py
+from functools import reduce
+from operator import and_, or_
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from rest_framework.filters import SearchFilter
+
+from .models import CustomUser
+
+
+DEFAULTS = {
+    # Shorter terms are matched as prefixes: trigram indexes cannot narrow
+    # down one- or two-character substrings.
+    "MIN_SUBSTRING_LENGTH": 3,
+    # Unfiltered admin changelists above this many rows show the planner's
+    # estimate instead of running COUNT(*).
+    "ESTIMATED_COUNT_THRESHOLD": 10_000,
+}
+
+SEARCH_FIELDS = ("username", "email", "name")
+
+
+def get_search_config():
+    return {**DEFAULTS, **getattr(settings, "USER_SEARCH", {})}
+
+
+def search_users(queryset, terms):
+    """
+    Users matching every term in any of SEARCH_FIELDS, case-insensitively.
+
+    Django compiles `istartswith` and `icontains` to
+    `UPPER(column::text) LIKE UPPER(...)` on PostgreSQL; the indexes made
+    by create_search_indexes() are on that same expression.
+    """
+    min_length = get_search_config()["MIN_SUBSTRING_LENGTH"]
+    conditions = []
+    for term in terms:
+        lookup = "icontains" if len(term) >= min_length else "istartswith"
+        conditions.append(reduce(or_, (Q(**{f"{field}__{lookup}": term}) for field in SEARCH_FIELDS)))
+    if not conditions:
+        return queryset
+    return queryset.filter(reduce(and_, conditions))
+
+
+class UserSearchFilter(SearchFilter):
+    """
+    `?search=` over username, email and name through search_users().
+    """
+
+    search_description = (
+        "Whitespace-separated terms, all of which must match the username, email "
+        "or name. Terms of three or more characters match anywhere, shorter "
+        "ones only at the start."
+    )
+
+    def filter_queryset(self, request, queryset, view):
+        return search_users(queryset, self.get_search_terms(request))
+
+
+def search_index_statements(table):
+    for field in SEARCH_FIELDS:
+        column = f"UPPER({field}::text)"
+        # Prefix LIKE needs the pattern opclass unless the collation is "C".
+        yield (
+            f"CREATE INDEX IF NOT EXISTS {table}_{field}_prefix "
+            f"ON {table} ({column} text_pattern_ops)"
+        )
+        # Trigram GIN serves LIKE '%term%' (icontains) and similarity.
+        yield (
+            f"CREATE INDEX IF NOT EXISTS {table}_{field}_trgm "
+            f"ON {table} USING gin ({column} gin_trgm_ops)"
+        )
+
+
+def create_search_indexes(sender, using="default", **kwargs):
+    """
+    post_migrate handler creating the PostgreSQL prefix and trigram indexes
+    behind search_users(). They use an extension and operator classes that
+    other databases lack, so they are not in CustomUser.Meta.indexes;
+    elsewhere search falls back to scans.
+    """
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for statement in search_index_statements(CustomUser._meta.db_table):
+            cursor.execute(statement)
+
+
+def estimate_row_count(model, using="default"):
+    """
+    The planner's row estimate for `model`'s table on PostgreSQL (kept up
+    to date by autovacuum), or None where there is none.
+    """
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    # -1 until the table is first vacuumed or analyzed.
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
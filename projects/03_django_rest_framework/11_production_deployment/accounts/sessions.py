@@ -0,0 +1,237 @@
+# accounts/sessions.py
+import time
+import zlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.sessions.backends.base import CreateError, SessionBase, UpdateError
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DatabaseError, IntegrityError, transaction
+from django.utils import timezone
+
+
+DEFAULTS = {
+    # Sessions are spread over these (cache alias, database alias) pairs by
+    # a hash of the first two characters of their key.
+    "SHARDS": [{"CACHE": "default", "DATABASE": "default"}],
+    # Seconds between database writes of a session whose data has not
+    # changed but whose expiry keeps moving (SESSION_SAVE_EVERY_REQUEST).
+    "WRITE_INTERVAL": 300,
+}
+
+KEY_PREFIX = "accounts.sessions:"
+
+# Caches that live inside one process: other workers cannot see them.
+PROCESS_LOCAL_CACHES = (LocMemCache, DummyCache)
+
+
+def get_session_store_config():
+    return {**DEFAULTS, **getattr(settings, "SESSION_STORE", {})}
+
+
+def shard_for(session_key):
+    shards = get_session_store_config()["SHARDS"]
+    return shards[zlib.crc32(session_key[:2].encode()) % len(shards)]
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_caches(app_configs, **kwargs):
+    """
+    Every shard's cache must be shared by all workers, or a request served
+    by another worker would not see the session's latest expiry.
+    """
+    if settings.SESSION_ENGINE != __name__:
+        return []
+    errors = []
+    for shard in get_session_store_config()["SHARDS"]:
+        cache = caches[shard["CACHE"]]
+        if isinstance(cache, PROCESS_LOCAL_CACHES):
+            errors.append(checks.Error(
+                f"Session cache {shard['CACHE']!r} ({type(cache).__name__}) is local to "
+                f"one process.",
+                hint="Point SESSION_STORE shards at a shared cache (file, memcached, redis).",
+                id="accounts.E001",
+            ))
+    return errors
+
+
+class SessionStore(SessionBase):
+    """
+    Session store that serves sessions from a cache in front of the
+    `django_session` table (SESSION_ENGINE = "accounts.sessions").
+
+    Creating a session, and every save that changes its data, writes the
+    row (write-through), so the table always holds the current data and
+    losing cache entries never logs anyone out. What is written behind is
+    the expiry: a save that only moves `expire_date` (such as every request
+    with SESSION_SAVE_EVERY_REQUEST) updates the cache and reaches the row
+    at most once per WRITE_INTERVAL seconds. A session reloaded from the
+    table after a cache loss can therefore expire up to WRITE_INTERVAL
+    seconds early. Saving a session that another request deleted (a
+    logout) raises UpdateError, as in Django's db backends, rather than
+    bringing it back.
+
+    Keys are sharded by prefix over SHARDS, each with its own cache and
+    database alias. The caches must be shared between processes (checked
+    at startup as accounts.E001).
+
+    Expired rows are removed by `manage.py purge_sessions` (or Django's
+    `clearsessions`, through clear_expired()).
+    """
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._written_at = None
+        # Serialized data as the table last saw it.
+        self._written_data = None
+
+    @classmethod
+    def get_model_class(cls):
+        # As in the db backend: importable without django.contrib.sessions.
+        from django.contrib.sessions.models import Session
+
+        return Session
+
+    @property
+    def model(self):
+        return self.get_model_class()
+
+    @staticmethod
+    def shard(session_key):
+        shard = shard_for(session_key)
+        return caches[shard["CACHE"]], shard["DATABASE"]
+
+    @staticmethod
+    def cache_key(session_key):
+        return KEY_PREFIX + session_key
+
+    def serialize(self, data):
+        # encode() is signed with a timestamp, so compare this instead.
+        return self.serializer().dumps(data)
+
+    def load(self):
+        session_key = self.session_key
+        if session_key is None:
+            return {}
+        cache, using = self.shard(session_key)
+        try:
+            entry = cache.get(self.cache_key(session_key))
+        except Exception:
+            # Some backends raise on invalid keys: treat as a new session.
+            entry = None
+
+        if entry is None:
+            row = (
+                self.model.objects.using(using)
+                .filter(session_key=session_key, expire_date__gt=timezone.now())
+                .first()
+            )
+            if row is None:
+                self._session_key = None
+                return {}
+            entry = {"data": self.decode(row.session_data), "written_at": time.time()}
+            cache.set(self.cache_key(session_key), entry, self.get_expiry_age(expiry=row.expire_date))
+
+        self._written_at = entry["written_at"]
+        self._written_data = self.serialize(entry["data"])
+        return entry["data"]
+
+    def exists(self, session_key):
+        cache, using = self.shard(session_key)
+        if self.cache_key(session_key) in cache:
+            return True
+        return self.model.objects.using(using).filter(session_key=session_key).exists()
+
+    def create(self):
+        while True:
+            self._session_key = self._get_new_session_key()
+            try:
+                self.save(must_create=True)
+            except CreateError:
+                continue
+            self.modified = True
+            return
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        data = self._get_session(no_load=must_create)
+        cache, using = self.shard(self.session_key)
+        now = time.time()
+        serialized = self.serialize(data)
+
+        interval = get_session_store_config()["WRITE_INTERVAL"]
+        if (
+            must_create
+            or serialized != self._written_data
+            or self._written_at is None
+            or now - self._written_at >= interval
+            # Evicted, or deleted (logout) since this request loaded it.
+            or self.cache_key(self.session_key) not in cache
+        ):
+            row = self.model(
+                session_key=self.session_key,
+                session_data=self.encode(data),
+                expire_date=self.get_expiry_date(),
+            )
+            try:
+                with transaction.atomic(using=using):
+                    row.save(using=using, force_insert=must_create, force_update=not must_create)
+            except IntegrityError:
+                if must_create:
+                    raise CreateError
+                raise
+            except DatabaseError:
+                # The row is gone: do not bring a deleted session back.
+                if not must_create:
+                    raise UpdateError
+                raise
+            self._written_at, self._written_data = now, serialized
+
+        entry = {"data": data, "written_at": self._written_at}
+        cache.set(self.cache_key(self.session_key), entry, self.get_expiry_age())
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        cache, using = self.shard(session_key)
+        cache.delete(self.cache_key(session_key))
+        self.model.objects.using(using).filter(session_key=session_key).delete()
+
+    async def aload(self):
+        return await sync_to_async(self.load)()
+
+    async def aexists(self, session_key):
+        return await sync_to_async(self.exists)(session_key)
+
+    async def acreate(self):
+        return await sync_to_async(self.create)()
+
+    async def asave(self, must_create=False):
+        return await sync_to_async(self.save)(must_create)
+
+    async def adelete(self, session_key=None):
+        return await sync_to_async(self.delete)(session_key)
+
+    @classmethod
+    def expired_sessions(cls, using):
+        return cls.get_model_class().objects.using(using).filter(expire_date__lt=timezone.now())
+
+    @classmethod
+    def database_aliases(cls):
+        return list(dict.fromkeys(shard["DATABASE"] for shard in get_session_store_config()["SHARDS"]))
+
+    @classmethod
+    def clear_expired(cls):
+        # Cache entries expire on their own.
+        for using in cls.database_aliases():
+            cls.expired_sessions(using).delete()
+
+    @classmethod
+    async def aclear_expired(cls):
+        await sync_to_async(cls.clear_expired)()
@@ -1,3 +1,176 @@
-from django.test import TestCase
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.sessions.backends.base import UpdateError
+from django.contrib.sessions.models import Session
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from .admin import EstimatedCountPaginator
+from .models import CustomUser
+from .search import search_index_statements, search_users
+from .sessions import SessionStore, check_shared_caches, shard_for
+
+
+class UserSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser(
+            username="admin", email="admin@example.com", password="secret"
+        )
+        CustomUser.objects.create_user(username="alice", email="alice@example.com", name="Alice Liddell")
+        CustomUser.objects.create_user(username="bob", email="bob@mail.test", name="Robert Malice")
+        CustomUser.objects.create_user(username="carol", email="carol@example.com", name="Carol Li")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def usernames(self, queryset):
+        return sorted(queryset.values_list("username", flat=True))
+
+    def test_short_terms_match_prefixes_long_terms_substrings(self):
+        users = CustomUser.objects.all()
+        self.assertEqual(self.usernames(search_users(users, ["al"])), ["alice"])
+        self.assertEqual(self.usernames(search_users(users, ["ALI"])), ["alice", "bob"])
+        self.assertEqual(self.usernames(search_users(users, ["ali", "example"])), ["alice"])
+
+    def test_search_endpoint_is_paginated(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get("/api/v1/users/?search=example.com&page_size=2")
+        self.assertEqual([user["username"] for user in response.json()["results"]], ["admin", "alice"])
+        response = self.client.get(response.json()["next"])
+        self.assertEqual([user["username"] for user in response.json()["results"]], ["carol"])
+        self.assertIsNone(response.json()["next"])
+
+    def test_admin_changelist_uses_estimate_for_large_tables(self):
+        paginator = EstimatedCountPaginator(CustomUser.objects.order_by("pk"), 100)
+        with mock.patch("accounts.admin.estimate_row_count", return_value=2_000_000):
+            self.assertEqual(paginator.count, 2_000_000)
+            # Searches are counted exactly.
+            filtered = EstimatedCountPaginator(search_users(CustomUser.objects.order_by("pk"), ["bob"]), 100)
+            self.assertEqual(filtered.count, 1)
+
+        self.client.force_login(self.admin)
+        response = self.client.get("/admin/accounts/customuser/?q=ali")
+        self.assertContains(response, "2 results")
+
+    def test_index_statements_match_lookup_expression(self):
+        statements = list(search_index_statements("accounts_customuser"))
+        self.assertEqual(len(statements), 6)
+        self.assertIn("(UPPER(email::text) text_pattern_ops)", statements[2])
+        self.assertIn("USING gin (UPPER(email::text) gin_trgm_ops)", statements[3])
+
+
+SESSION_TEST_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "sessions": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "sessions"},
+    "tokens": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "tokens"},
+}
+
+
+@override_settings(CACHES=SESSION_TEST_CACHES)
+class SessionStoreTests(TestCase):
+    def setUp(self):
+        caches["sessions"].clear()
+
+    def test_data_changes_are_written_through(self):
+        session = SessionStore()
+        session["cart"] = [1]
+        session.save()
+        self.assertEqual(Session.objects.get().get_decoded(), {"cart": [1]})
+
+        session = SessionStore(session.session_key)
+        session["cart"] = [1, 2]
+        session.save()
+        self.assertEqual(Session.objects.get().get_decoded(), {"cart": [1, 2]})
+
+        # Losing the cache falls back to the table.
+        caches["sessions"].clear()
+        self.assertEqual(SessionStore(session.session_key)["cart"], [1, 2])
+
+        key = session.session_key
+        session.flush()
+        self.assertFalse(Session.objects.exists())
+        self.assertEqual(SessionStore(key).load(), {})
+
+    def test_expiry_only_saves_are_deferred(self):
+        session = SessionStore()
+        session["cart"] = [1]
+        session.save()
+        expire_date = Session.objects.get().expire_date
+
+        later = time.time() + 60
+        with mock.patch("accounts.sessions.time.time", return_value=later):
+            session = SessionStore(session.session_key)
+            session.load()
+            with self.assertNumQueries(0):
+                session.save()
+        self.assertEqual(Session.objects.get().expire_date, expire_date)
+
+        # Once WRITE_INTERVAL has passed the next save writes the row.
+        with mock.patch("accounts.sessions.time.time", return_value=later + 300):
+            session = SessionStore(session.session_key)
+            session.load()
+            session.save()
+        self.assertGreater(Session.objects.get().expire_date, expire_date)
+
+    def test_save_after_delete_does_not_revive_the_session(self):
+        for change in (False, True):
+            with self.subTest(change=change):
+                session = SessionStore()
+                session["_auth_user_id"] = "1"
+                session.save()
+                key = session.session_key
+
+                session = SessionStore(key)
+                self.assertEqual(session["_auth_user_id"], "1")
+                SessionStore(key).delete()  # another request logs out
+                if change:
+                    session["cart"] = [1]
+                with self.assertRaises(UpdateError):
+                    session.save()
+                self.assertEqual(SessionStore(key).load(), {})
+                self.assertFalse(Session.objects.filter(session_key=key).exists())
+
+    def test_login_writes_the_session_row(self):
+        user = CustomUser.objects.create_user(username="dave", password="secret")
+        self.assertTrue(self.client.login(username="dave", password="secret"))
+        caches["sessions"].clear()
+        self.assertEqual(self.client.session["_auth_user_id"], str(user.pk))
+
+    def test_process_local_cache_fails_the_check(self):
+        self.assertEqual([error.id for error in check_shared_caches(None)], ["accounts.E001"])
+        file_cache = {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": "/tmp/sessions"}
+        with self.settings(CACHES={**SESSION_TEST_CACHES, "sessions": file_cache}):
+            self.assertEqual(check_shared_caches(None), [])
+
+    def test_shards_by_key_prefix(self):
+        shards = [{"CACHE": "default", "DATABASE": "default"}, {"CACHE": "other", "DATABASE": "default"}]
+        with self.settings(SESSION_STORE={"SHARDS": shards}):
+            self.assertIs(shard_for("ab" + "x" * 30), shard_for("ab" + "y" * 30))
+            used = {shard_for(f"{a}{b}" + "x" * 30)["CACHE"] for a in "abcdef" for b in "0123456789"}
+            self.assertEqual(used, {"default", "other"})
+
+    def test_purge_sessions_in_batches(self):
+        expired = timezone.now() - timedelta(days=1)
+        Session.objects.bulk_create(
+            Session(session_key=f"expired{i:04}", session_data="", expire_date=expired) for i in range(5)
+        )
+        Session.objects.create(session_key="current0", session_data="", expire_date=timezone.now() + timedelta(days=1))
+        inactive = CustomUser.objects.create_user(username="gone", is_active=False)
+        active = CustomUser.objects.create_user(username="here")
+        Token.objects.create(user=inactive)
+        Token.objects.create(user=active)
+
+        out = StringIO()
+        call_command("purge_sessions", batch_size=2, pause=0, stdout=out)
+        self.assertIn("Deleted 5 expired session(s) and 1 orphaned token(s).", out.getvalue())
+        self.assertEqual(list(Session.objects.values_list("session_key", flat=True)), ["current0"])
+        self.assertEqual(list(Token.objects.values_list("user__username", flat=True)), ["here"])
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import tempfile
 from pathlib import Path
 from pathlib import Path
 from environs import Env
@@ -60,6 +61,7 @@ MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'posts.middleware.CompressionMiddleware',  # zstd/br/gzip API responses
     'corsheaders.middleware.CorsMiddleware',  # new
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -108,6 +110,112 @@ SPECTACULAR_SETTINGS = {
     # OTHER SETTINGS can be added here
 }
 
+# /api/schema/ serves this file from memory (posts/schema.py). Regenerate it
+# on deploy with `python manage.py spectacular --validate --file schema.yml`.
+# In DEBUG the file is compared with a freshly generated schema on first use.
+PRECOMPUTED_SCHEMA = {
+    "PATH": BASE_DIR / "schema.yml",
+    "CHECK_STALE": DEBUG,
+}
+
+# "default" is per process. "sessions" and "tokens" must be shared by every
+# worker (accounts.E001, posts.E001); set SESSION_CACHE_URL and
+# TOKEN_CACHE_URL, e.g. redis://host:6379/1, when the workers do not share
+# a filesystem.
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "sessions": env.dj_cache_url(
+        "SESSION_CACHE_URL",
+        default=f"file://{Path(tempfile.gettempdir()) / 'blog-api-sessions'}?max_entries=100000",
+    ),
+    "tokens": env.dj_cache_url(
+        "TOKEN_CACHE_URL",
+        default=f"file://{Path(tempfile.gettempdir()) / 'blog-api-tokens'}?max_entries=100000",
+    ),
+}
+
+# Sessions are served from the "sessions" cache in front of django_session
+# (accounts/sessions.py): data changes are written through, expiry updates
+# at most every WRITE_INTERVAL seconds. Add shards ({"CACHE": alias,
+# "DATABASE": alias}) to spread them by key prefix. `manage.py
+# purge_sessions` removes expired sessions and the tokens of deactivated
+# users; run it periodically.
+SESSION_ENGINE = "accounts.sessions"
+SESSION_STORE = {
+    "SHARDS": [{"CACHE": "sessions", "DATABASE": "default"}],
+    "WRITE_INTERVAL": 300,
+}
+
+# Server-side cache of PostViewSet list/retrieve data (posts/caching.py).
+# The default local-memory cache is per process; point ALIAS at a shared
+# cache (e.g. file based) when running several workers.
+POSTS_RESPONSE_CACHE = {
+    "ALIAS": "default",
+    "TIMEOUT": 300,
+}
+
+# Bulk endpoint of PostViewSet (posts/bulk.py): maximum items per request
+# and how many throttle units one batch consumes.
+POSTS_BULK_MAX_ITEMS = 100
+POSTS_BULK_THROTTLE_WEIGHT = 1
+
+# Idempotency-Key support on PostViewSet create/update (posts/idempotency.py).
+# Run `manage.py prune_idempotency_keys` periodically to delete expired keys.
+POSTS_IDEMPOTENCY = {
+    "ALIAS": "default",
+    "TTL": 24 * 60 * 60,
+    "LOCK_TIMEOUT": 60,
+    "METHODS": ["POST", "PUT"],
+}
+
+# Post view counts (posts/counters.py): each worker buffers increments and
+# writes them in one UPDATE every FLUSH_INTERVAL seconds or MAX_PENDING views.
+POSTS_VIEW_COUNTS = {
+    "FLUSH_INTERVAL": 10,
+    "MAX_PENDING": 1000,
+}
+
+# Rows fetched per round trip by the streaming /export/ endpoints (posts/export.py).
+POSTS_EXPORT_CHUNK_SIZE = 2000
+
+# Token lookups cached by posts.authentication.CachedTokenAuthentication.
+TOKEN_AUTH_CACHE = {
+    "ALIAS": "tokens",
+    "TIMEOUT": 300,
+    "HASH_KEYS": True,  # store SHA-256 digests of tokens, not the tokens
+}
+
+# Post change feed (posts/changes.py): /api/v1/changes/ and its SSE stream.
+POSTS_CHANGE_FEED = {
+    "PAGE_SIZE": 100,
+    "POLL_INTERVAL": 1.0,
+    "HEARTBEAT": 15,
+    "MAX_STREAM_SECONDS": 300,
+    "MAX_SYNC_STREAM_SECONDS": 25,
+    "COMMIT_LAG": 5,
+    "RETENTION_DAYS": 7,
+}
+
+# accounts/search.py: user search in the API (`?search=`) and admin.
+USER_SEARCH = {
+    "MIN_SUBSTRING_LENGTH": 3,
+    "ESTIMATED_COUNT_THRESHOLD": 10_000,
+}
+
+# posts.middleware.CompressionMiddleware: preferred encodings, in order, and
+# the smallest body worth compressing.
+RESPONSE_COMPRESSION = {
+    "ENCODINGS": ["zstd", "br", "gzip"],
+    "MIN_SIZE": 512,
+}
+
+# Per-phase request timings (posts/profiling.py), served at /api/v1/metrics/.
+# SERVER_TIMING adds a Server-Timing header; it defaults to DEBUG.
+API_PROFILING = {
+    "ENABLED": True,
+    "SERVER_TIMING": None,
+}
+
 
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"  # For development
 SITE_ID = 1 
@@ -175,11 +283,11 @@ REST_FRAMEWORK = {
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [  # new
         "rest_framework.authentication.SessionAuthentication",
-        "rest_framework.authentication.TokenAuthentication",  # n",
+        "posts.authentication.CachedTokenAuthentication",  # cached TokenAuthentication
     ],
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
+        "posts.throttling.AnonRateThrottle",  # Sliding-window counters
+        "posts.throttling.UserRateThrottle",
         "posts.throttling.FivePerFiveMinuteThrottle",  # Custom throttle
     ],
     "DEFAULT_THROTTLE_RATES": {
@@ -187,8 +295,20 @@ REST_FRAMEWORK = {
         "user": "5/day",                  # Example: 5 requests per day for authenticated users
         "burst": "10/minute",             # Example: 10 requests per minute
         "five_per_five_minute": "5/5m",   # 5 requests per 5 minutes
+        "changes": "60/minute",           # change feed polls and reconnects
     },
     # Custom exception handler
     "EXCEPTION_HANDLER": "posts.exceptions.custom_exception_handler",
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema", # new
+    "DEFAULT_RENDERER_CLASSES": [
+        "posts.renderers.FastJSONRenderer",
+        "posts.renderers.MessagePackRenderer",  # Accept: application/msgpack
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "rest_framework.parsers.JSONParser",
+        "posts.parsers.MessagePackParser",  # Content-Type: application/msgpack
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
@@ -0,0 +1,150 @@
+# posts/async_views.py
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .authentication import AsyncSessionAuthentication, CachedTokenAuthentication
+from .counters import view_counter
+from .fast_serializers import ValuesSerializer
+from .models import Post
+from .pagination import AsyncPostCursorPagination
+from .permissions import IsAuthorOrReadOnly
+from .renderers import FastJSONRenderer
+from .serializers import PostListSerializer, PostSerializer
+from .throttling import FivePerFiveMinuteThrottle
+
+
+class AsyncReadOnlyAPIView(View):
+    """
+    Async counterpart of APIView for read-only endpoints.
+
+    DRF views are synchronous, so under ASGI each request to them runs in a
+    worker thread. Here authentication, permission and throttle checks run
+    on the event loop through the `aauthenticate()` / `aallow_request()`
+    methods of the classes that have them (others are called through
+    sync_to_async), and handlers use the async ORM. Errors go through the
+    configured EXCEPTION_HANDLER and responses are always JSON.
+    """
+
+    http_method_names = ["get", "head", "options"]
+    authentication_classes = (AsyncSessionAuthentication, CachedTokenAuthentication)
+    permission_classes = ()
+    throttle_classes = ()
+    renderer = FastJSONRenderer()
+
+    async def dispatch(self, request, *args, **kwargs):
+        method = request.method.lower()
+        if method not in ("get", "head"):
+            return await super().dispatch(request, *args, **kwargs)
+
+        self.request = request = Request(request, authenticators=())
+        self.args, self.kwargs = args, kwargs
+        self.headers = {}
+        try:
+            await self.initial(request)
+            response = await self.get(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        for name, value in self.headers.items():
+            response[name] = value
+        return response
+
+    async def initial(self, request):
+        await self.perform_authentication(request)
+        self.check_permissions(request)
+        await self.check_throttles(request)
+
+    async def perform_authentication(self, request):
+        for authenticator in (cls() for cls in self.authentication_classes):
+            if hasattr(authenticator, "aauthenticate"):
+                user_auth = await authenticator.aauthenticate(request)
+            else:
+                user_auth = await sync_to_async(authenticator.authenticate)(request)
+            if user_auth is not None:
+                request.user, request.auth = user_auth
+                return
+        request.user = api_settings.UNAUTHENTICATED_USER()
+        request.auth = None
+
+    def check_permissions(self, request):
+        for permission in (cls() for cls in self.permission_classes):
+            if not permission.has_permission(request, self):
+                if not request.user.is_authenticated:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied(getattr(permission, "message", None))
+
+    async def check_throttles(self, request):
+        durations = []
+        for throttle in (cls() for cls in self.throttle_classes):
+            if hasattr(throttle, "aallow_request"):
+                allowed = await throttle.aallow_request(request, self)
+            else:
+                allowed = await sync_to_async(throttle.allow_request)(request, self)
+            if not allowed:
+                durations.append(throttle.wait())
+        if durations:
+            raise exceptions.Throttled(
+                max((duration for duration in durations if duration is not None), default=None)
+            )
+
+    def handle_exception(self, exc):
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            # As in APIView: 401 only if the first authenticator sends a challenge.
+            header = self.authentication_classes[0]().authenticate_header(self.request)
+            if header:
+                self.headers["WWW-Authenticate"] = header
+            else:
+                exc.status_code = 403
+
+        response = api_settings.EXCEPTION_HANDLER(exc, {"view": self, "request": self.request})
+        if response is None:
+            raise exc
+        if "Retry-After" in response:
+            self.headers["Retry-After"] = response["Retry-After"]
+        return self.render(response.data, status=response.status_code)
+
+    def render(self, data, status=200):
+        return HttpResponse(self.renderer.render(data), status=status, content_type="application/json")
+
+
+class AsyncPostListView(AsyncReadOnlyAPIView):
+    """
+    Async form of `GET /api/v1/`: same cursor pages, `?fields=` and body.
+    """
+
+    permission_classes = (IsAuthorOrReadOnly,)
+    throttle_classes = (FivePerFiveMinuteThrottle,)
+    pagination_class = AsyncPostCursorPagination
+
+    async def get(self, request, *args, **kwargs):
+        # Lists leave out `body` unless the client picks fields explicitly.
+        serializer_class = PostSerializer if "fields" in request.query_params else PostListSerializer
+        reader = ValuesSerializer.for_serializer(serializer_class(context={"request": request}))
+        ordering = [field.lstrip("-") for field in self.pagination_class.ordering]
+        queryset = Post.objects.values(*dict.fromkeys([*reader.sources, *ordering]))
+
+        paginator = self.pagination_class()
+        page = await paginator.apaginate_queryset(queryset, request, self)
+        return self.render(paginator.get_paginated_response(reader.many(page)).data)
+
+
+class AsyncPostDetailView(AsyncReadOnlyAPIView):
+    """
+    Async form of `GET /api/v1/<pk>/`.
+    """
+
+    permission_classes = (IsAuthorOrReadOnly,)
+    throttle_classes = (FivePerFiveMinuteThrottle,)
+    view_counter = view_counter
+
+    async def get(self, request, pk, *args, **kwargs):
+        reader = ValuesSerializer.for_serializer(PostSerializer(context={"request": request}))
+        try:
+            row = await Post.objects.values(*reader.sources).aget(pk=pk)
+        except Post.DoesNotExist:
+            raise exceptions.NotFound()
+        await self.view_counter.arecord(pk)
+        return self.render(reader.to_representation(row))
@@ -0,0 +1,160 @@
+# posts/authentication.py
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import checks
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import (
+    SessionAuthentication,
+    TokenAuthentication,
+    get_authorization_header,
+)
+from rest_framework.permissions import SAFE_METHODS
+
+from .caching import is_local_cache
+
+
+DEFAULTS = {
+    "ALIAS": "default",
+    "TIMEOUT": 300,
+    "HASH_KEYS": True,
+}
+
+
+def get_token_cache_config():
+    return {**DEFAULTS, **getattr(settings, "TOKEN_AUTH_CACHE", {})}
+
+
+@checks.register(checks.Tags.caches)
+def check_token_cache(app_configs, **kwargs):
+    """
+    Token and user changes evict entries from the cache in the process
+    that made them; a per-process cache would keep authenticating deleted
+    tokens and deactivated users in every other worker.
+    """
+    alias = get_token_cache_config()["ALIAS"]
+    if not is_local_cache(caches[alias]):
+        return []
+    return [checks.Error(
+        f"Token cache {alias!r} is local to one process.",
+        hint="Point TOKEN_AUTH_CACHE['ALIAS'] at a shared cache (file, memcached, redis).",
+        id="posts.E001",
+    )]
+
+
+def token_cache_key(key):
+    """
+    Cache key for a token. With HASH_KEYS (the default) only a SHA-256
+    digest of the token is used, so raw credentials never sit in the cache;
+    the cached value is just the user's id.
+    """
+    if get_token_cache_config()["HASH_KEYS"]:
+        key = hashlib.sha256(key.encode()).hexdigest()
+    return f"auth_token:{key}"
+
+
+def invalidate_token(key):
+    config = get_token_cache_config()
+    caches[config["ALIAS"]].delete(token_cache_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that caches which user a token belongs to.
+
+    DRF joins the token table to the user table on every request; here the
+    token is looked up once per TIMEOUT seconds and later requests only
+    load the user by primary key, so deactivation takes effect at once.
+    Only the user's id is cached (under a digest of the token), never the
+    token or user objects. Entries are removed as soon as the token is
+    deleted or rotated (see posts/signals.py), which reaches every worker
+    because the cache must be shared (posts.E001). Unknown tokens are never
+    cached.
+    """
+
+    def authenticate_credentials(self, key):
+        config = get_token_cache_config()
+        cache = caches[config["ALIAS"]]
+        cache_key = token_cache_key(key)
+
+        user_id = cache.get(cache_key)
+        if user_id is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(cache_key, user.pk, timeout=config["TIMEOUT"])
+            return (user, token)
+
+        try:
+            user = get_user_model()._default_manager.get(pk=user_id)
+        except get_user_model().DoesNotExist:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+        # The token's primary key is the key the client just sent.
+        return (user, self.get_model()(key=key, user=user))
+
+    def get_token_key(self, request):
+        """
+        The token from the Authorization header, parsed as in authenticate().
+        """
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(_("Invalid token header."))
+        try:
+            return auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(_("Invalid token header."))
+
+    async def aauthenticate(self, request):
+        key = self.get_token_key(request)
+        if key is None:
+            return None
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        config = get_token_cache_config()
+        cache = caches[config["ALIAS"]]
+        cache_key = token_cache_key(key)
+
+        if is_local_cache(cache):
+            user_id = cache.get(cache_key)
+        else:
+            user_id = await cache.aget(cache_key)
+        if user_id is None:
+            model = self.get_model()
+            try:
+                token = await model.objects.select_related("user").aget(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_("Invalid token."))
+            user = token.user
+            await cache.aset(cache_key, user.pk, timeout=config["TIMEOUT"])
+        else:
+            try:
+                user = await get_user_model()._default_manager.aget(pk=user_id)
+            except get_user_model().DoesNotExist:
+                raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+            token = self.get_model()(key=key, user=user)
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+        return (user, token)
+
+
+class AsyncSessionAuthentication(SessionAuthentication):
+    """
+    SessionAuthentication with an `aauthenticate()` for async views, which
+    loads the session user with `request.auser()`. Only safe methods are
+    supported, as they need no CSRF check.
+    """
+
+    async def aauthenticate(self, request):
+        if request.method not in SAFE_METHODS:
+            raise exceptions.MethodNotAllowed(request.method)
+        user = await request._request.auser()
+        if not user or not user.is_active:
+            return None
+        return (user, None)
@@ -0,0 +1,194 @@
+# posts/bulk.py
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.response import Response
+
+
+class BulkWriteMixin:
+    """
+    `/bulk/` endpoint that creates (POST), updates (PATCH) or deletes
+    (DELETE) many objects in one request.
+
+    The whole batch is validated first and written in a single transaction
+    with bulk_create / bulk_update / one DELETE; if any item is invalid
+    nothing is written and the response lists the errors by position
+    (`{}` for items that were fine). A batch is charged
+    POSTS_BULK_THROTTLE_WEIGHT throttle units instead of one per item.
+
+    `invalidate_objects(pks)` and `record_changes(action, pks)` are called
+    once per batch. bulk_create and bulk_update send no model signals;
+    deletes go through one QuerySet.delete(), which does send post_delete
+    per row, so views whose receivers do the same work should turn them off
+    around bulk_destroy().
+    """
+
+    bulk_max_items_setting = "POSTS_BULK_MAX_ITEMS"
+    bulk_throttle_weight_setting = "POSTS_BULK_THROTTLE_WEIGHT"
+
+    def get_throttle_weight(self, request):
+        if getattr(self, "action", None) == "bulk":
+            return getattr(settings, self.bulk_throttle_weight_setting, 1)
+        return 1
+
+    def invalidate_objects(self, pks):
+        pass
+
+    def record_changes(self, action, pks):
+        pass
+
+    def get_bulk_items(self, request):
+        items = request.data
+        if request.method == "DELETE" and isinstance(items, dict):
+            items = items.get("ids")
+        if not isinstance(items, list) or not items:
+            raise ValidationError({"detail": "Expected a non-empty list."})
+        max_items = getattr(settings, self.bulk_max_items_setting, 100)
+        if len(items) > max_items:
+            raise ValidationError({"detail": f"At most {max_items} items per request."})
+        return items
+
+    def permitted_pks(self, request, pks):
+        """
+        The subset of `pks` the user may write, in one query, when every
+        permission class can express itself as a queryset filter
+        (`filter_queryset`). Returns None otherwise, and objects are then
+        checked one by one.
+        """
+        permissions = self.get_permissions()
+        if not all(hasattr(permission, "filter_queryset") for permission in permissions):
+            return None
+        queryset = self.get_queryset().model.objects.filter(pk__in=pks)
+        for permission in permissions:
+            queryset = permission.filter_queryset(request, queryset, self)
+        return set(queryset.values_list("pk", flat=True))
+
+    def object_permission_error(self, request, obj, permitted=None):
+        if permitted is not None:
+            if obj.pk in permitted:
+                return {}
+            return {"detail": PermissionDenied.default_detail}
+        for permission in self.get_permissions():
+            if not permission.has_object_permission(request, self, obj):
+                return {"detail": getattr(permission, "message", PermissionDenied.default_detail)}
+        return {}
+
+    @action(detail=False, methods=["post", "patch", "delete"], url_path="bulk")
+    def bulk(self, request, *args, **kwargs):
+        items = self.get_bulk_items(request)
+        if request.method == "POST":
+            return self.bulk_create(request, items)
+        if request.method == "PATCH":
+            return self.bulk_update(request, items)
+        return self.bulk_destroy(request, items)
+
+    def bulk_create(self, request, items):
+        serializer = self.get_serializer(data=items, many=True)
+        if not serializer.is_valid():
+            return Response({"errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        model = self.get_queryset().model
+        with transaction.atomic():
+            objs = model.objects.bulk_create(
+                model(**data) for data in serializer.validated_data
+            )
+            self.record_changes("created", [obj.pk for obj in objs])
+        self.invalidate_objects([obj.pk for obj in objs])
+        return Response(
+            self.get_serializer(objs, many=True).data, status=status.HTTP_201_CREATED
+        )
+
+    def to_pk(self, value):
+        """
+        Coerce a client-supplied id to the pk type, or None if it is invalid.
+        """
+        if isinstance(value, (dict, list)):
+            return None
+        try:
+            return self.get_queryset().model._meta.pk.to_python(value)
+        except DjangoValidationError:
+            return None
+
+    def get_bulk_objects(self, pks):
+        model = self.get_queryset().model
+        # Plain manager rather than get_queryset(): writes need every column.
+        return model.objects.in_bulk(pks)
+
+    def bulk_update(self, request, items):
+        pks = [self.to_pk(item.get("id")) if isinstance(item, dict) else None for item in items]
+        objects = self.get_bulk_objects([pk for pk in pks if pk is not None])
+        permitted = self.permitted_pks(request, list(objects))
+
+        errors, updated, fields = [], [], set()
+        for pk, item in zip(pks, items):
+            obj = objects.get(pk) if pk is not None else None
+            if obj is None:
+                errors.append({"id": ["Unknown or missing id."]})
+                continue
+            error = self.object_permission_error(request, obj, permitted)
+            if error:
+                errors.append(error)
+                continue
+            serializer = self.get_serializer(obj, data=item, partial=True)
+            if not serializer.is_valid():
+                errors.append(serializer.errors)
+                continue
+            for name, value in serializer.validated_data.items():
+                setattr(obj, name, value)
+                fields.add(name)
+            updated.append(obj)
+            errors.append({})
+
+        if any(errors):
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        # bulk_update() skips auto_now, so stamp updated_at ourselves.
+        now = timezone.now()
+        for obj in updated:
+            obj.updated_at = now
+        with transaction.atomic():
+            self.get_queryset().model.objects.bulk_update(
+                updated, sorted(fields | {"updated_at"})
+            )
+            self.record_changes("updated", [obj.pk for obj in updated])
+        self.invalidate_objects([obj.pk for obj in updated])
+        return Response(self.get_serializer(updated, many=True).data)
+
+    def bulk_destroy(self, request, items):
+        pks = [self.to_pk(item) for item in items]
+        known_pks = [pk for pk in pks if pk is not None]
+        permitted = self.permitted_pks(request, known_pks)
+        if permitted is not None:
+            # Only ids are needed to tell unknown from forbidden rows.
+            model = self.get_queryset().model
+            existing = set(model.objects.filter(pk__in=known_pks).values_list("pk", flat=True))
+        else:
+            objects = self.get_bulk_objects(known_pks)
+
+        errors = []
+        for pk in pks:
+            if permitted is not None:
+                if pk not in existing:
+                    errors.append({"id": ["Unknown id."]})
+                elif pk not in permitted:
+                    errors.append({"detail": PermissionDenied.default_detail})
+                else:
+                    errors.append({})
+            elif objects.get(pk) is None:
+                errors.append({"id": ["Unknown id."]})
+            else:
+                errors.append(self.object_permission_error(request, objects[pk]))
+
+        if any(errors):
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        pks = list(dict.fromkeys(pks))
+        with transaction.atomic():
+            self.get_queryset().model.objects.filter(pk__in=pks).delete()
+            self.record_changes("deleted", pks)
+        self.invalidate_objects(pks)
+        return Response(status=status.HTTP_204_NO_CONTENT)
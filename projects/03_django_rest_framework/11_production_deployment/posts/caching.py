@@ -0,0 +1,166 @@
+# posts/caching.py
+import hashlib
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache as default_cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from rest_framework.response import Response
+
+
+DEFAULTS = {
+    "ALIAS": "default",
+    "TIMEOUT": 300,
+}
+
+
+def is_local_cache(cache):
+    """
+    Whether `cache` lives in this process, so async code can call its sync
+    methods directly instead of paying a thread hop per call.
+    """
+    if cache is default_cache:
+        cache = caches[DEFAULT_CACHE_ALIAS]
+    return isinstance(cache, LocMemCache)
+
+
+class ResponseCache:
+    """
+    Versioned cache of serialized response data.
+
+    Backends such as local-memory and file caches cannot delete keys by
+    pattern, so entries are never deleted: every key embeds the current
+    value of one or more version counters, and invalidating means bumping
+    a counter so the old keys are simply never read again (they expire on
+    their own). A lost concurrent bump on the file backend is harmless,
+    since either bump moves the counter past the cached version.
+
+    With the local-memory backend each worker process has its own cache and
+    counters, so writes served by one worker only invalidate that worker's
+    entries; use a shared backend (file, memcached, redis) with several
+    workers.
+    """
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+
+    @property
+    def config(self):
+        return {**DEFAULTS, **getattr(settings, "POSTS_RESPONSE_CACHE", {})}
+
+    @property
+    def cache(self):
+        return caches[self.config["ALIAS"]]
+
+    def _version_key(self, name):
+        return f"{self.prefix}:version:{name}"
+
+    def _stats_key(self, name):
+        return f"{self.prefix}:stats:{name}"
+
+    def versions(self, names):
+        keys = [self._version_key(name) for name in names]
+        found = self.cache.get_many(keys)
+        return [found.get(key, 0) for key in keys]
+
+    def _incr(self, key):
+        self.cache.add(key, 0, timeout=None)
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.set(key, 1, timeout=None)
+
+    def bump(self, *names):
+        for name in names:
+            self._incr(self._version_key(name))
+
+    def make_key(self, request, view, version_names):
+        """
+        Key on the URL with its query parameters in a stable order, the
+        view's permission classes, the negotiated media type and the
+        current version of everything the response depends on.
+        """
+        params = sorted(request.query_params.lists())
+        permissions = [cls.__module__ + "." + cls.__qualname__ for cls in view.permission_classes]
+        parts = (
+            request.build_absolute_uri(request.path),
+            params,
+            permissions,
+            request.accepted_media_type,
+            list(zip(version_names, self.versions(version_names))),
+        )
+        digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+        return f"{self.prefix}:response:{digest}"
+
+    def record(self, hit):
+        self._incr(self._stats_key("hits" if hit else "misses"))
+
+    def stats(self):
+        found = self.cache.get_many([self._stats_key("hits"), self._stats_key("misses")])
+        hits = found.get(self._stats_key("hits"), 0)
+        misses = found.get(self._stats_key("misses"), 0)
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+        }
+
+    def reset_stats(self):
+        self.cache.delete_many([self._stats_key("hits"), self._stats_key("misses")])
+
+
+post_response_cache = ResponseCache("posts")
+
+
+def invalidate_posts(pks):
+    # Any list page may contain the posts, so one "list" bump covers the
+    # batch; each post's detail has its own version.
+    post_response_cache.bump("list", *(f"detail:{pk}" for pk in dict.fromkeys(pks)))
+
+
+def invalidate_post(pk):
+    invalidate_posts([pk])
+
+
+def invalidate_post_details(pks):
+    # For columns that change often but matter little on list pages (view
+    # counts): those keep their cached copies until TIMEOUT.
+    post_response_cache.bump(*(f"detail:{pk}" for pk in dict.fromkeys(pks)))
+
+
+class ResponseCacheMixin:
+    """
+    Serve list and retrieve from `response_cache` when possible.
+
+    Lookups happen inside the action, after authentication, permission and
+    throttle checks have run, so cached data is never shown to a client the
+    view would have refused.
+    """
+
+    response_cache = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(["list"], super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        return self.cached_response(
+            [f"detail:{lookup}"], super().retrieve, request, *args, **kwargs
+        )
+
+    def cached_response(self, version_names, render, request, *args, **kwargs):
+        cache = self.response_cache
+        key = cache.make_key(request, self, version_names)
+        data = cache.cache.get(key)
+        if data is not None:
+            cache.record(hit=True)
+            response = Response(data)
+            response["X-Cache"] = "HIT"
+            return response
+
+        cache.record(hit=False)
+        response = render(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.cache.set(key, response.data, timeout=cache.config["TIMEOUT"])
+        response["X-Cache"] = "MISS"
+        return response
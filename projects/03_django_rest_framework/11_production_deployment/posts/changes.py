@@ -0,0 +1,189 @@
+# posts/changes.py
+import asyncio
+import time
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .fast_serializers import ValuesSerializer
+from .models import Post, PostChange
+from .renderers import FastJSONRenderer
+from .serializers import PostSerializer
+
+
+DEFAULTS = {
+    "PAGE_SIZE": 100,  # changes per REST page / per SSE poll
+    "POLL_INTERVAL": 1.0,  # seconds between log reads while streaming
+    "HEARTBEAT": 15,  # seconds of silence before a keep-alive comment
+    "MAX_STREAM_SECONDS": 300,  # clients reconnect with Last-Event-ID after this
+    "MAX_SYNC_STREAM_SECONDS": 25,  # the same when the stream holds a WSGI worker
+    "COMMIT_LAG": 5,  # seconds a change waits before it is served; see visible_changes()
+    "RETRY_MS": 1000,  # reconnection delay suggested to EventSource clients
+    "RETENTION_DAYS": 7,  # see the prune_post_changes command
+}
+
+
+def get_feed_config():
+    return {**DEFAULTS, **getattr(settings, "POSTS_CHANGE_FEED", {})}
+
+
+def record_changes(action, pks):
+    PostChange.objects.bulk_create(PostChange(post_id=pk, action=action) for pk in pks)
+
+
+def commit_cutoff():
+    return timezone.now() - timedelta(seconds=get_feed_config()["COMMIT_LAG"])
+
+
+def latest_change_id():
+    """
+    A cursor for "from now on": the last id, or if changes younger than
+    COMMIT_LAG exist, the one before the first of them, since lower ids
+    may still commit.
+    """
+    changes = PostChange.objects.order_by("id").values_list("id", flat=True)
+    young = changes.filter(created_at__gt=commit_cutoff()).first()
+    if young is not None:
+        return young - 1
+    return changes.reverse().first() or 0
+
+
+def changes_query(since, limit):
+    # One extra row tells whether more changes are waiting.
+    return PostChange.objects.filter(id__gt=since).order_by("id")[:limit + 1]
+
+
+def visible_changes(changes, limit):
+    """
+    The first `limit` of `changes` (in id order) that are safe to hand out,
+    and whether more are waiting.
+
+    Ids are allocated at INSERT but become visible at COMMIT, so a
+    transaction can commit a lower id after a client has read past it.
+    Changes are therefore only served once they are COMMIT_LAG seconds
+    old, and never past a younger one: everything behind the cursor has
+    then had COMMIT_LAG seconds to commit. Log writes run in the post's
+    transaction, so COMMIT_LAG must exceed the longest such transaction
+    (and the clock skew between app servers).
+    """
+    cutoff = commit_cutoff()
+    for index, change in enumerate(changes[:limit]):
+        if change.created_at > cutoff:
+            return changes[:index], False
+    return changes[:limit], len(changes) > limit
+
+
+def posts_query(changes):
+    """
+    Current state of the posts touched by `changes`, as `.values()` rows,
+    plus the reader that renders them like PostSerializer.
+    """
+    reader = ValuesSerializer.for_serializer(PostSerializer())
+    pks = {change.post_id for change in changes if change.action != PostChange.DELETED}
+    return reader, Post.objects.filter(pk__in=pks).values(*reader.sources)
+
+
+def serialize_changes(changes, reader, rows):
+    posts = {row["id"]: reader.to_representation(row) for row in rows}
+    return [
+        {
+            "id": change.id,
+            "action": change.action,
+            "post_id": change.post_id,
+            "created_at": change.created_at,
+            # None for deletions, and for posts deleted since the change.
+            "post": posts.get(change.post_id),
+        }
+        for change in changes
+    ]
+
+
+def changes_since(since, limit):
+    """
+    Up to `limit` serialized changes after cursor `since`, and whether
+    there are more.
+    """
+    changes, has_more = visible_changes(list(changes_query(since, limit)), limit)
+    reader, rows = posts_query(changes)
+    return serialize_changes(changes, reader, rows), has_more
+
+
+async def achanges_since(since, limit):
+    changes, has_more = visible_changes([change async for change in changes_query(since, limit)], limit)
+    reader, rows = posts_query(changes)
+    return serialize_changes(changes, reader, [row async for row in rows]), has_more
+
+
+def format_event(change):
+    # Same JSON as the REST endpoint; it never contains a raw newline.
+    data = FastJSONRenderer().render(change)
+    return f"id: {change['id']}\nevent: {change['action']}\ndata: ".encode() + data + b"\n\n"
+
+
+class ChangeStream:
+    """
+    Server-sent events for the changes after a cursor.
+
+    The log is polled every POLL_INTERVAL seconds; each change is sent with
+    its id, so a reconnecting EventSource resumes from Last-Event-ID. Quiet
+    periods get a comment line every HEARTBEAT seconds to keep proxies from
+    closing the connection, and the stream ends after MAX_STREAM_SECONDS so
+    long-lived connections are recycled.
+
+    Iterating the stream (WSGI) holds a worker thread for the whole
+    connection, so it ends after MAX_SYNC_STREAM_SECONDS instead; under
+    ASGI the async iterator is used and only the event loop is involved.
+
+    Changes are sent COMMIT_LAG seconds after they are logged, so none is
+    skipped by committing behind the cursor (see visible_changes()).
+    """
+
+    def __init__(self, since):
+        self.since = since
+        self.config = get_feed_config()
+
+    def start(self, max_seconds):
+        self.deadline = time.monotonic() + max_seconds
+        self.last_sent = time.monotonic()
+        return f"retry: {self.config['RETRY_MS']}\n\n".encode()
+
+    def events(self, changes):
+        self.since = changes[-1]["id"]
+        self.last_sent = time.monotonic()
+        return b"".join(format_event(change) for change in changes)
+
+    def heartbeat(self):
+        if time.monotonic() - self.last_sent < self.config["HEARTBEAT"]:
+            return None
+        self.last_sent = time.monotonic()
+        return b": keep-alive\n\n"
+
+    def __iter__(self):
+        yield self.start(self.config["MAX_SYNC_STREAM_SECONDS"])
+        while True:
+            changes, has_more = changes_since(self.since, self.config["PAGE_SIZE"])
+            if changes:
+                yield self.events(changes)
+                if has_more:
+                    continue
+            elif (heartbeat := self.heartbeat()) is not None:
+                yield heartbeat
+            if time.monotonic() >= self.deadline:
+                return
+            time.sleep(self.config["POLL_INTERVAL"])
+
+    async def __aiter__(self):
+        yield self.start(self.config["MAX_STREAM_SECONDS"])
+        while True:
+            changes, has_more = await achanges_since(self.since, self.config["PAGE_SIZE"])
+            if changes:
+                yield self.events(changes)
+                if has_more:
+                    continue
+            elif (heartbeat := self.heartbeat()) is not None:
+                yield heartbeat
+            if time.monotonic() >= self.deadline:
+                return
+            await asyncio.sleep(self.config["POLL_INTERVAL"])
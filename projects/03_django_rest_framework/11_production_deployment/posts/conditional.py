@@ -0,0 +1,105 @@
+# posts/conditional.py
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.http import Http404
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(request, *parts):
+    """
+    ETag for one representation of a resource.
+
+    Besides the resource's own version (`parts`), the hash covers the query
+    string (fields, cursor, page size), the negotiated media type and the
+    user, since any of these changes the response body.
+    """
+    key = "|".join(
+        str(part)
+        for part in (*parts, request.get_full_path(), request.accepted_media_type, request.user.pk)
+    )
+    return quote_etag(hashlib.md5(key.encode(), usedforsecurity=False).hexdigest())
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified validators and 304 responses for list and retrieve.
+
+    The validators come from one cheap query on `last_modified_field`
+    (the row's value for retrieve, MAX() and COUNT() for list), and a
+    matching If-None-Match / If-Modified-Since returns 304 before the
+    objects are loaded or serialized. Lists get an ETag only: deleting any
+    but the newest object leaves MAX() unchanged, so a Last-Modified date
+    would let If-Modified-Since revalidate a stale page.
+
+    `counter_fields` are columns that change without touching
+    `last_modified_field` (such as write-behind counters). Their values go
+    into the retrieve ETag only, so a client that revalidates with
+    If-Modified-Since alone may keep a stale count. Lists leave them out,
+    as a busy counter would change every list ETag at each flush.
+    """
+
+    last_modified_field = "updated_at"
+    counter_fields = ()
+    # Query parameters that add data `last_modified_field` does not track
+    # (such as expanded relations); those requests get no validators.
+    unvalidated_params = ()
+
+    def is_validated(self, request):
+        return not any(param in request.query_params for param in self.unvalidated_params)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.is_validated(request):
+            return super().retrieve(request, *args, **kwargs)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        lookup = self.kwargs[lookup_url_kwarg]
+        try:
+            row = (
+                self.filter_queryset(self.get_queryset())
+                .filter(**{self.lookup_field: lookup})
+                .values_list(self.last_modified_field, *self.counter_fields)
+                .first()
+            )
+        except (TypeError, ValueError, ValidationError):
+            # A malformed lookup, as get_object_or_404() treats it.
+            raise Http404
+        if row is None:
+            # Unknown object: let the regular path raise the 404.
+            return super().retrieve(request, *args, **kwargs)
+
+        last_modified, *counters = row
+        etag = make_etag(request, lookup, last_modified.isoformat(), *counters)
+        return self.conditional_response(
+            etag, last_modified, super().retrieve, request, *args, **kwargs
+        )
+
+    def list(self, request, *args, **kwargs):
+        if not self.is_validated(request):
+            return super().list(request, *args, **kwargs)
+        stats = self.filter_queryset(self.get_queryset()).aggregate(
+            last_modified=Max(self.last_modified_field),
+            count=Count("pk"),
+        )
+        last_modified = stats["last_modified"]
+        etag = make_etag(
+            request, stats["count"], last_modified.isoformat() if last_modified else ""
+        )
+        return self.conditional_response(etag, None, super().list, request, *args, **kwargs)
+
+    def conditional_response(self, etag, last_modified, render, request, *args, **kwargs):
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = render(request, *args, **kwargs)
+            if not 200 <= response.status_code < 300:
+                return response
+
+        response["ETag"] = etag
+        if timestamp is not None:
+            response["Last-Modified"] = http_date(timestamp)
+        # Cached copies must be revalidated and are only valid for this user.
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ("Authorization", "Cookie"))
+        return response
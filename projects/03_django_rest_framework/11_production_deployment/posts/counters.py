@@ -0,0 +1,164 @@
+# posts/counters.py
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connections, router
+from django.db.models import Case, F, When
+
+from .caching import invalidate_post_details
+from .models import Post
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "FLUSH_INTERVAL": 10,  # seconds between flushes of a worker's buffer
+    "MAX_PENDING": 1000,  # buffered increments that trigger an early flush
+}
+
+
+def get_counter_config():
+    return {**DEFAULTS, **getattr(settings, "POSTS_VIEW_COUNTS", {})}
+
+
+class WriteBehindCounter:
+    """
+    Per-process buffer of increments to an integer column of `model`,
+    written back as aggregated deltas.
+
+    Counting only touches a dict. FLUSH_INTERVAL seconds after the first
+    buffered increment a background thread writes them all with one
+    `UPDATE ... SET col = CASE WHEN pk IN (...) THEN col + n ... END` (as
+    does the next record() once MAX_PENDING increments are waiting), so a
+    hot row costs one write per interval per worker instead of one per
+    view, and workers add to the column rather than overwrite it. Counts in
+    the database therefore lag by up to FLUSH_INTERVAL. After each write
+    `on_flush` is called with the updated pks, e.g. to invalidate cached
+    responses that include the column.
+
+    A failed flush keeps its deltas for the next one. The buffer is also
+    flushed when the process exits normally (e.g. a worker restart); a
+    worker that is killed loses at most one interval of increments.
+    Counters created with `background=False` are only flushed by record()
+    and by calling flush().
+    """
+
+    def __init__(self, model, field, on_flush=None, background=True):
+        self.model = model
+        self.field = field
+        self.on_flush = on_flush
+        self.background = background
+        self.lock = threading.Lock()
+        self.pending = Counter()
+        self.size = 0
+        self.last_flush = time.monotonic()
+        self.timer = None
+
+    def using(self):
+        return router.db_for_write(self.model)
+
+    def schedule(self, interval):
+        # Called with the lock held.
+        if self.background and self.timer is None:
+            self.timer = threading.Timer(interval, self.flush_in_background)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def add(self, pk, amount=1):
+        """
+        Buffer an increment; return whether a flush is due.
+        """
+        config = get_counter_config()
+        pk = self.model._meta.pk.to_python(pk)
+        with self.lock:
+            self.pending[pk] += amount
+            self.size += amount
+            self.schedule(config["FLUSH_INTERVAL"])
+            return (
+                self.size >= config["MAX_PENDING"]
+                or time.monotonic() - self.last_flush >= config["FLUSH_INTERVAL"]
+            )
+
+    def record(self, pk):
+        if self.add(pk):
+            self.flush()
+
+    async def arecord(self, pk):
+        if self.add(pk):
+            await sync_to_async(self.flush)()
+
+    def flush_in_background(self):
+        with self.lock:
+            self.timer = None
+        try:
+            self.flush()
+        finally:
+            # The timer thread's own connections.
+            connections.close_all()
+        with self.lock:
+            if self.pending:
+                self.schedule(get_counter_config()["FLUSH_INTERVAL"])
+
+    def flush(self):
+        """
+        Write the buffered deltas; return the number of rows updated.
+        """
+        with self.lock:
+            pending = self.pending
+            self.pending, self.size = Counter(), 0
+            self.last_flush = time.monotonic()
+        if not pending:
+            return 0
+
+        try:
+            updated = self.write(pending, self.using())
+        except DatabaseError:
+            logger.exception("Flushing %s failed; keeping the deltas for the next flush.", self.field)
+            with self.lock:
+                self.pending.update(pending)
+                self.size += sum(pending.values())
+            return 0
+        if self.on_flush is not None:
+            self.on_flush(list(pending))
+        return updated
+
+    def write(self, pending, using):
+        # One WHEN per distinct delta keeps the statement short when most
+        # rows got the same number of views.
+        pks_by_delta = defaultdict(list)
+        for pk, delta in pending.items():
+            pks_by_delta[delta].append(pk)
+        column = F(self.field)
+        value = Case(
+            *(When(pk__in=pks, then=column + delta) for delta, pks in pks_by_delta.items()),
+            default=column,
+            output_field=self.model._meta.get_field(self.field),
+        )
+        return self.model._default_manager.using(using).filter(pk__in=list(pending)).update(**{self.field: value})
+
+
+# Cached post details include view_count. List pages are not invalidated,
+# which would empty the whole list cache every FLUSH_INTERVAL; their counts
+# lag by up to the response cache TIMEOUT.
+view_counter = WriteBehindCounter(Post, "view_count", on_flush=invalidate_post_details)
+atexit.register(view_counter.flush)
+
+
+class ViewCountMixin:
+    """
+    Count GET retrieves that found the object, including 304 and cached
+    responses, in `view_counter`.
+    """
+
+    view_counter = None
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        if request.method == "GET" and response.status_code in (200, 304):
+            self.view_counter.record(self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+        return response
@@ -0,0 +1,100 @@
+# posts/fast_serializers.py
+import copy
+from operator import itemgetter
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+
+
+class ValuesSerializer:
+    """
+    Read-only serializer for `.values()` rows, compiled from a ModelSerializer.
+
+    The field list, the `.values()` keys and the per-field conversions are
+    worked out once; rendering a row is then a tuple lookup plus conversion
+    of the few fields whose representation differs from the database value.
+    The output matches the ModelSerializer it was built from.
+    """
+
+    # Fields whose to_representation() is a no-op on the value .values()
+    # already returns (str for CharField, int for IntegerField, the pk for
+    # PrimaryKeyRelatedField, ...).
+    passthrough_fields = (
+        serializers.CharField,
+        serializers.IntegerField,
+        serializers.BooleanField,
+        serializers.PrimaryKeyRelatedField,
+    )
+
+    _compiled = {}
+
+    def __init__(self, serializer, prefix=""):
+        fields = [
+            field for field in serializer.fields.values() if not field.write_only
+        ]
+        for field in fields:
+            if field.source == "*" or isinstance(field, serializers.ListSerializer):
+                raise ImproperlyConfigured(
+                    f"{type(serializer).__name__}.{field.field_name} is not a model "
+                    "field and cannot be read from .values() rows."
+                )
+        self.names = tuple(field.field_name for field in fields)
+        # Nested serializers (expanded relations) read their fields from the
+        # same row through `<relation>__<field>` keys, i.e. a JOIN.
+        self.nested = tuple(
+            (field.field_name, type(self)(field, prefix=self.column(field, prefix)))
+            for field in fields
+            if isinstance(field, serializers.BaseSerializer)
+        )
+        nested = dict(self.nested)
+        # One key per field. For a nested field it is the foreign key, which
+        # only tells whether there is a related row.
+        keys = tuple(self.column(field, prefix) for field in fields)
+        sources = []
+        for field, key in zip(fields, keys):
+            sources.append(key)
+            if field.field_name in nested:
+                sources.extend(nested[field.field_name].sources)
+        self.sources = tuple(dict.fromkeys(sources))
+        # Unbound copies, so the cached reader does not keep the first
+        # request's serializer (and its context) alive.
+        self.converters = tuple(
+            (index, copy.deepcopy(field).to_representation)
+            for index, field in enumerate(fields)
+            if type(field) not in self.passthrough_fields and field.field_name not in nested
+        )
+        self.getter = itemgetter(*keys)
+        if len(keys) == 1:
+            getter = self.getter
+            self.getter = lambda row: (getter(row),)
+
+    @staticmethod
+    def column(field, prefix=""):
+        column = field.source.replace(".", "__")
+        return f"{prefix}__{column}" if prefix else column
+
+    @classmethod
+    def for_serializer(cls, serializer):
+        """
+        Return the compiled reader for a serializer instance, reusing it for
+        every request that selects the same fields.
+        """
+        key = (type(serializer), tuple((name, type(field)) for name, field in serializer.fields.items()))
+        reader = cls._compiled.get(key)
+        if reader is None:
+            reader = cls._compiled[key] = cls(serializer)
+        return reader
+
+    def to_representation(self, row):
+        values = list(self.getter(row))
+        for index, convert in self.converters:
+            if values[index] is not None:
+                values[index] = convert(values[index])
+        data = dict(zip(self.names, values))
+        for name, reader in self.nested:
+            data[name] = reader.to_representation(row) if data[name] is not None else None
+        return data
+
+    def many(self, rows):
+        to_representation = self.to_representation
+        return [to_representation(row) for row in rows]
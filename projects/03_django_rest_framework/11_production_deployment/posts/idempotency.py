@@ -0,0 +1,202 @@
+# posts/idempotency.py
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+
+DEFAULTS = {
+    "ALIAS": "default",  # cache serving replays
+    "TTL": 24 * 60 * 60,  # seconds a key and its response are kept
+    "LOCK_TIMEOUT": 60,  # seconds after which an unfinished request's key is reusable
+    "METHODS": ["POST", "PUT"],
+}
+
+
+def get_idempotency_config():
+    return {**DEFAULTS, **getattr(settings, "POSTS_IDEMPOTENCY", {})}
+
+
+class IdempotencyKeyInUse(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "A request with this Idempotency-Key is still being processed."
+    default_code = "idempotency_key_in_use"
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "This Idempotency-Key was already used for a different request."
+    default_code = "idempotency_key_reused"
+
+
+idempotency_key_parameter = OpenApiParameter(
+    "Idempotency-Key",
+    str,
+    OpenApiParameter.HEADER,
+    description=(
+        "Client-chosen unique key. Retrying with the same key and body returns the "
+        "first response instead of writing again."
+    ),
+)
+
+
+def request_fingerprint(request):
+    payload = json.dumps([request.method, request.path, request.data], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class IdempotencyMixin:
+    """
+    `Idempotency-Key` header support for create (POST) and update (PUT).
+
+    The first request with a key claims it with an IdempotencyKey row,
+    which the unique (user, key) constraint makes race-free, then runs in
+    one transaction with the row's completion, so a crash leaves neither
+    the write nor a stored response. Successful responses are kept for
+    TTL seconds in the table and in the cache. A retry with the same key
+    and body gets the stored response back with `Idempotent-Replayed:
+    true`. Replays are found from the cache (the table only when the cache
+    has lost the entry) before throttles run, so they neither hit the
+    database nor use throttle quota. A different body with the same key
+    is refused with 422, and a retry while the first request is still
+    running gets 409.
+
+    Keys are per user and only authenticated writes use them. Rows are
+    bounded by the write throttle times TTL per user; expired rows are
+    deleted by the prune_idempotency_keys command, and a key whose request
+    never finished becomes reusable after LOCK_TIMEOUT seconds.
+    """
+
+    idempotency_header = "Idempotency-Key"
+
+    @extend_schema(parameters=[idempotency_key_parameter])
+    def create(self, request, *args, **kwargs):
+        return self.idempotent(super().create, request, *args, **kwargs)
+
+    @extend_schema(parameters=[idempotency_key_parameter])
+    def update(self, request, *args, **kwargs):
+        return self.idempotent(super().update, request, *args, **kwargs)
+
+    def check_throttles(self, request):
+        # Authentication and permissions have run by now.
+        self.idempotency_key = self.get_idempotency_key(request)
+        self.idempotent_replay = None
+        if self.idempotency_key is not None:
+            self.idempotency_fingerprint = request_fingerprint(request)
+            self.idempotent_replay = self.find_replay(request)
+        if self.idempotent_replay is None:
+            super().check_throttles(request)
+
+    def get_idempotency_key(self, request):
+        if request.method not in get_idempotency_config()["METHODS"]:
+            return None
+        key = request.headers.get(self.idempotency_header)
+        if key is None or not request.user.is_authenticated:
+            return None
+        max_length = IdempotencyKey._meta.get_field("key").max_length
+        if not key or len(key) > max_length:
+            raise ValidationError({self.idempotency_header: f"Must be 1 to {max_length} characters."})
+        return key
+
+    def idempotency_cache_key(self, request):
+        digest = hashlib.sha256(self.idempotency_key.encode()).hexdigest()
+        return f"idempotency:{request.user.pk}:{digest}"
+
+    def find_replay(self, request):
+        """
+        The stored response for the request's key, or None if the key is
+        unused (or its request died). Raises if it cannot be replayed.
+        """
+        config = get_idempotency_config()
+        cache = caches[config["ALIAS"]]
+        stored = cache.get(self.idempotency_cache_key(request))
+        if stored is None:
+            now = timezone.now()
+            record = IdempotencyKey.objects.filter(
+                user=request.user, key=self.idempotency_key, expires_at__gt=now
+            ).first()
+            if record is None:
+                return None
+            if record.status_code is None:
+                if record.created_at > now - timedelta(seconds=config["LOCK_TIMEOUT"]):
+                    raise IdempotencyKeyInUse()
+                return None
+            stored = {
+                "fingerprint": record.fingerprint,
+                "status": record.status_code,
+                "data": record.response,
+            }
+            timeout = (record.expires_at - now).total_seconds()
+            cache.set(self.idempotency_cache_key(request), stored, timeout=timeout)
+        if stored["fingerprint"] != self.idempotency_fingerprint:
+            raise IdempotencyKeyReused()
+        return stored
+
+    def claim_idempotency_key(self, request):
+        """
+        Insert the key's row, or return None if another request has it.
+        """
+        config = get_idempotency_config()
+        now = timezone.now()
+        stale = Q(expires_at__lte=now) | Q(
+            status_code__isnull=True,
+            created_at__lte=now - timedelta(seconds=config["LOCK_TIMEOUT"]),
+        )
+        IdempotencyKey.objects.filter(stale, user=request.user, key=self.idempotency_key).delete()
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(
+                    user=request.user,
+                    key=self.idempotency_key,
+                    fingerprint=self.idempotency_fingerprint,
+                    expires_at=now + timedelta(seconds=config["TTL"]),
+                )
+        except IntegrityError:
+            return None
+
+    def replay(self, stored):
+        return Response(stored["data"], status=stored["status"], headers={"Idempotent-Replayed": "true"})
+
+    def idempotent(self, handler, request, *args, **kwargs):
+        if getattr(self, "idempotency_key", None) is None:
+            return handler(request, *args, **kwargs)
+        if self.idempotent_replay is not None:
+            return self.replay(self.idempotent_replay)
+
+        record = self.claim_idempotency_key(request)
+        if record is None:
+            # A concurrent request with the same key got there first.
+            stored = self.find_replay(request)
+            if stored is None:
+                raise IdempotencyKeyInUse()
+            return self.replay(stored)
+
+        try:
+            with transaction.atomic():
+                response = handler(request, *args, **kwargs)
+                if status.is_success(response.status_code):
+                    record.status_code = response.status_code
+                    record.response = response.data
+                    record.save(update_fields=["status_code", "response"])
+        except Exception:
+            record.delete()
+            raise
+        if not status.is_success(response.status_code):
+            record.delete()
+            return response
+
+        config = get_idempotency_config()
+        stored = {"fingerprint": record.fingerprint, "status": record.status_code, "data": response.data}
+        caches[config["ALIAS"]].set(self.idempotency_cache_key(request), stored, timeout=config["TTL"])
+        return response
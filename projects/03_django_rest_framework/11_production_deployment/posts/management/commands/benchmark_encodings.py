@@ -0,0 +1,58 @@
+# posts/management/commands/benchmark_encodings.py
+import json
+
+import msgpack
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts.fast_serializers import ValuesSerializer
+from posts.middleware import COMPRESSORS, get_compression_config
+from posts.models import Post
+from posts.profiling import best_of
+from posts.renderers import FastJSONRenderer, MessagePackRenderer
+from posts.serializers import PostSerializer
+
+
+class Command(BaseCommand):
+    help = "Compare JSON and MessagePack output size and encode time, raw and compressed, on generated posts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=100,
+                            help="Posts per response (a page is 100 by default).")
+        parser.add_argument("--repeat", type=int, default=20,
+                            help="Runs per measurement; the best run is reported.")
+
+    def handle(self, *args, **options):
+        count = options["count"]
+        # Everything is generated inside a transaction that is rolled back.
+        with transaction.atomic():
+            user = get_user_model().objects.create(username="bench-encodings", email="bench@example.com")
+            Post.objects.bulk_create(
+                Post(author=user, title=f"Post {i}", body="Lorem ipsum dolor sit amet " * 10)
+                for i in range(count)
+            )
+            reader = ValuesSerializer.for_serializer(PostSerializer())
+            data = reader.many(Post.objects.order_by("id").values(*reader.sources))
+            transaction.set_rollback(True)
+
+        bodies = {}
+        for label, renderer in (("json", FastJSONRenderer()), ("msgpack", MessagePackRenderer())):
+            elapsed, bodies[label] = best_of(lambda: renderer.render(data), options["repeat"])
+            self.stdout.write(f"{label:13} {len(bodies[label]):>6} bytes  encode {elapsed * 1000:7.2f} ms")
+
+        if msgpack.unpackb(bodies["msgpack"]) != json.loads(bodies["json"]):
+            raise CommandError("The JSON and MessagePack bodies decode to different data.")
+
+        levels = get_compression_config()["LEVELS"]
+        for encoding, make_compressor in COMPRESSORS.items():
+            for label, body in bodies.items():
+                def compress():
+                    compressor = make_compressor(levels[encoding])
+                    return compressor.compress(body) + compressor.finish()
+
+                elapsed, compressed = best_of(compress, options["repeat"])
+                self.stdout.write(
+                    f"{label + '+' + encoding:13} {len(compressed):>6} bytes "
+                    f"({len(compressed) / len(body):.0%})  compress {elapsed * 1000:7.2f} ms"
+                )
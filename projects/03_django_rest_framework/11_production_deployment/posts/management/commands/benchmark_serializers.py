@@ -0,0 +1,57 @@
+# posts/management/commands/benchmark_serializers.py
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from posts.fast_serializers import ValuesSerializer
+from posts.models import Post
+from posts.profiling import best_of
+from posts.renderers import FastJSONRenderer
+from posts.serializers import PostSerializer, UserSerializer
+
+
+class Command(BaseCommand):
+    help = "Compare ModelSerializer and ValuesSerializer list rendering on generated posts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=10_000,
+                            help="Number of posts (and users) to generate.")
+        parser.add_argument("--repeat", type=int, default=5,
+                            help="Runs per path; the best run is reported.")
+
+    def handle(self, *args, **options):
+        count = options["count"]
+        # Everything is generated inside a transaction that is rolled back.
+        with transaction.atomic():
+            User = get_user_model()
+            users = User.objects.bulk_create(
+                User(username=f"bench-user-{i}", email=f"bench-{i}@example.com")
+                for i in range(count)
+            )
+            Post.objects.bulk_create(
+                Post(author=users[i % len(users)], title=f"Post {i}", body="Lorem ipsum " * 20)
+                for i in range(count)
+            )
+            self.compare("PostSerializer", PostSerializer, Post.objects.order_by("id"), options["repeat"])
+            self.compare("UserSerializer", UserSerializer, User.objects.order_by("id"), options["repeat"])
+            transaction.set_rollback(True)
+
+    def compare(self, label, serializer_class, queryset, repeat):
+        def model_path():
+            return JSONRenderer().render(serializer_class(queryset.all(), many=True).data)
+
+        def values_path():
+            reader = ValuesSerializer.for_serializer(serializer_class())
+            return FastJSONRenderer().render(reader.many(queryset.values(*reader.sources)))
+
+        slow, slow_body = best_of(model_path, repeat)
+        fast, fast_body = best_of(values_path, repeat)
+        if slow_body != fast_body:
+            raise CommandError(f"{label}: the two paths rendered different output.")
+
+        self.stdout.write(
+            f"{label}: ModelSerializer {slow * 1000:.1f} ms, "
+            f"ValuesSerializer {fast * 1000:.1f} ms ({slow / fast:.1f}x), "
+            f"{len(fast_body)} bytes, identical output"
+        )
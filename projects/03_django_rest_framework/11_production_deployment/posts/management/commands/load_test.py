@@ -0,0 +1,270 @@
+# posts/management/commands/load_test.py
+import asyncio
+import json
+import math
+import random
+import secrets
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.settings import api_settings
+
+from posts.caching import post_response_cache
+from posts.models import Post
+
+
+OPERATIONS = ("list", "detail", "create", "update")
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed users, tokens and posts, then drive concurrent list/detail/create/update "
+        "traffic at the posts API and report latency percentiles and throughput."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=20)
+        parser.add_argument("--posts", type=int, default=1000)
+        parser.add_argument("--requests", type=int, default=2000,
+                            help="Total number of requests across all workers.")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--mix", default="list=60,detail=30,create=5,update=5",
+                            help="Relative weight of each operation.")
+        parser.add_argument("--interface", choices=("wsgi", "asgi"), default="wsgi",
+                            help="In-process handler to call when --url is not given.")
+        parser.add_argument("--url",
+                            help="Base URL of a running server, e.g. http://127.0.0.1:8000. "
+                                 "It must use the same database as this command.")
+        parser.add_argument("--throttle-rate", default="1000000/s",
+                            help="In-process only: rate applied to every throttle scope, so "
+                                 "throttles still run but do not reject. Use 'settings' to "
+                                 "keep the configured rates.")
+        parser.add_argument("--read-path", choices=("sync", "async", "both"), default="sync",
+                            help="Send list/detail reads to the viewset, to the async views "
+                                 "under /api/v1/async/ (best with --interface asgi), or run "
+                                 "the same plan against each and report both.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--keep", action="store_true",
+                            help="Keep the seeded rows instead of deleting them afterwards.")
+
+    def handle(self, *args, **options):
+        weights = self.parse_mix(options["mix"])
+        if options["users"] < 1 or options["concurrency"] < 1:
+            raise CommandError("--users and --concurrency must be at least 1.")
+
+        # A fresh prefix per run, and cleanup() only deletes the users seed()
+        # created, so rows from other runs (or anyone else) are left alone.
+        self.prefix = f"loadtest-{secrets.token_hex(4)}-"
+        self.seed(options["users"], options["posts"])
+        try:
+            rates = api_settings.DEFAULT_THROTTLE_RATES
+            if options["url"] is None and options["throttle_rate"] != "settings":
+                rates = dict.fromkeys(rates, options["throttle_rate"])
+            rest_framework = {**getattr(settings, "REST_FRAMEWORK", {}), "DEFAULT_THROTTLE_RATES": rates}
+            read_paths = ("sync", "async") if options["read_path"] == "both" else (options["read_path"],)
+            runs = []
+            with override_settings(REST_FRAMEWORK=rest_framework):
+                for read_path in read_paths:
+                    runs.append((read_path, *self.run(weights, options, read_path)))
+        finally:
+            if options["keep"]:
+                self.stdout.write(f"Kept the seeded users (usernames starting with {self.prefix!r}).")
+            else:
+                self.cleanup()
+        for read_path, results, elapsed in runs:
+            self.stdout.write(f"\n{read_path} read path:")
+            self.report(results, elapsed)
+
+    def parse_mix(self, mix):
+        weights = {}
+        for part in mix.split(","):
+            name, _, weight = part.partition("=")
+            name = name.strip()
+            if name not in OPERATIONS:
+                raise CommandError(f"Unknown operation {name!r}; choose from {', '.join(OPERATIONS)}.")
+            try:
+                weights[name] = float(weight)
+            except ValueError:
+                raise CommandError(f"Invalid weight in {part!r}.")
+        if not any(weights.values()):
+            raise CommandError("--mix needs at least one positive weight.")
+        return weights
+
+    def seed(self, users, posts):
+        User = get_user_model()
+        self.users = User.objects.bulk_create(
+            User(username=f"{self.prefix}{i}", email=f"{self.prefix}{i}@example.com")
+            for i in range(users)
+        )
+        tokens = Token.objects.bulk_create(
+            Token(user=user, key=Token.generate_key()) for user in self.users
+        )
+        self.tokens = [token.key for token in tokens]
+        created = Post.objects.bulk_create(
+            Post(author=self.users[i % users], title=f"Load test {i}", body="Lorem ipsum " * 20)
+            for i in range(posts)
+        )
+        # bulk_create() sends no signals, so cached list pages are stale.
+        post_response_cache.bump("list")
+        self.post_ids = [post.pk for post in created]
+        self.own_post_ids = defaultdict(list)
+        for post in created:
+            self.own_post_ids[post.author_id].append(post.pk)
+        self.stdout.write(f"Seeded {users} users with tokens and {posts} posts.")
+
+    def cleanup(self):
+        # Deleting the users cascades to their tokens and posts, including
+        # the posts created during the run.
+        get_user_model().objects.filter(pk__in=[user.pk for user in self.users]).delete()
+
+    def plan(self, worker, count, weights, seed, read_path):
+        """
+        The (operation, method, path, body) requests one worker sends, drawn
+        up front so that generating them is not part of the timings.
+        """
+        rng = random.Random(seed + worker)
+        user = self.users[worker % len(self.users)]
+        own = self.own_post_ids[user.pk]
+        reads = "/api/v1/async/" if read_path == "async" else "/api/v1/"
+        requests = []
+        for name in rng.choices(list(weights), list(weights.values()), k=count):
+            if name == "detail" and self.post_ids:
+                requests.append((name, "GET", f"{reads}{rng.choice(self.post_ids)}/", None))
+            elif name == "update" and own:
+                body = {"title": f"Updated {rng.randrange(10**6)}"}
+                requests.append((name, "PATCH", f"/api/v1/{rng.choice(own)}/", body))
+            elif name == "create":
+                body = {"author": user.pk, "title": "Load test", "body": "Lorem ipsum"}
+                requests.append((name, "POST", "/api/v1/", body))
+            else:
+                requests.append(("list", "GET", reads, None))
+        return self.tokens[worker % len(self.tokens)], requests
+
+    def run(self, weights, options, read_path):
+        concurrency = options["concurrency"]
+        plans = [
+            self.plan(worker, options["requests"] // concurrency
+                      + (worker < options["requests"] % concurrency),
+                      weights, options["seed"], read_path)
+            for worker in range(concurrency)
+        ]
+        if options["url"]:
+            target = f"server at {options['url']}"
+        else:
+            target = f"in-process {options['interface'].upper()} handler"
+        self.stdout.write(f"Sending {options['requests']} requests from {concurrency} workers to the {target}...")
+
+        # The test clients always send "Host: testserver".
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            start = time.perf_counter()
+            if options["url"] is None and options["interface"] == "asgi":
+                results = asyncio.run(self.run_asgi(plans))
+            else:
+                send = self.url_sender(options["url"]) if options["url"] else self.wsgi_sender()
+                with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                    results = list(executor.map(lambda plan: self.run_worker(send, *plan), plans))
+        return [sample for worker in results for sample in worker], time.perf_counter() - start
+
+    def run_worker(self, send, token, requests):
+        samples = []
+        try:
+            for name, method, path, body in requests:
+                start = time.perf_counter()
+                status = send(token, method, path, body)
+                samples.append((name, time.perf_counter() - start, status))
+        finally:
+            # Each thread opened its own database connections.
+            if threading.current_thread() is not threading.main_thread():
+                connections.close_all()
+        return samples
+
+    def wsgi_sender(self):
+        local = threading.local()
+
+        def send(token, method, path, body):
+            if not hasattr(local, "client"):
+                local.client = Client()
+            response = local.client.generic(
+                method, path,
+                data=json.dumps(body) if body is not None else "",
+                content_type="application/json",
+                headers={"authorization": f"Token {token}"},
+            )
+            return response.status_code
+        return send
+
+    def url_sender(self, base_url):
+        base_url = base_url.rstrip("/")
+
+        def send(token, method, path, body):
+            request = urllib.request.Request(
+                base_url + path,
+                data=json.dumps(body).encode() if body is not None else None,
+                method=method,
+                headers={"Authorization": f"Token {token}", "Content-Type": "application/json"},
+            )
+            try:
+                with urllib.request.urlopen(request) as response:
+                    response.read()
+                    return response.status
+            except urllib.error.HTTPError as error:
+                return error.code
+        return send
+
+    async def run_asgi(self, plans):
+        async def worker(token, requests):
+            client = AsyncClient()
+            samples = []
+            for name, method, path, body in requests:
+                start = time.perf_counter()
+                response = await client.generic(
+                    method, path,
+                    data=json.dumps(body) if body is not None else "",
+                    content_type="application/json",
+                    headers={"authorization": f"Token {token}"},
+                )
+                samples.append((name, time.perf_counter() - start, response.status_code))
+            return samples
+
+        return await asyncio.gather(*(worker(*plan) for plan in plans))
+
+    def percentile(self, ordered, p):
+        # Nearest-rank percentile of an already sorted list.
+        return ordered[max(math.ceil(p / 100 * len(ordered)) - 1, 0)]
+
+    def report(self, samples, elapsed):
+        if not samples:
+            self.stdout.write("No requests were sent.")
+            return
+        by_name = defaultdict(list)
+        for name, seconds, status in samples:
+            by_name[name].append((seconds, status))
+        by_name["all"] = [(seconds, status) for _, seconds, status in samples]
+
+        self.stdout.write(
+            f"{len(samples)} requests in {elapsed:.2f} s: {len(samples) / elapsed:.1f} req/s"
+        )
+        self.stdout.write(
+            f"{'operation':<10}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}  statuses"
+        )
+        for name in (*OPERATIONS, "all"):
+            if name not in by_name:
+                continue
+            rows = by_name[name]
+            ordered = sorted(seconds * 1000 for seconds, _ in rows)
+            statuses = ", ".join(f"{code}: {count}" for code, count in sorted(Counter(s for _, s in rows).items()))
+            self.stdout.write(
+                f"{name:<10}{len(rows):>8}"
+                f"{self.percentile(ordered, 50):>10.1f}{self.percentile(ordered, 95):>10.1f}"
+                f"{self.percentile(ordered, 99):>10.1f}{ordered[-1]:>10.1f}  {statuses}"
+            )
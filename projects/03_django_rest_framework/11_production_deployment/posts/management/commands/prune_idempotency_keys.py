@@ -0,0 +1,13 @@
+# posts/management/commands/prune_idempotency_keys.py
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Delete Idempotency-Keys whose POSTS_IDEMPOTENCY['TTL'] has passed."
+
+    def handle(self, *args, **options):
+        deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+        self.stdout.write(f"Deleted {deleted} expired idempotency key(s).")
@@ -0,0 +1,21 @@
+# posts/management/commands/prune_post_changes.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.changes import get_feed_config
+from posts.models import PostChange
+
+
+class Command(BaseCommand):
+    help = "Delete change feed entries older than POSTS_CHANGE_FEED['RETENTION_DAYS']."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, help="Override the configured retention.")
+
+    def handle(self, *args, **options):
+        days = options["days"] if options["days"] is not None else get_feed_config()["RETENTION_DAYS"]
+        cutoff = timezone.now() - timedelta(days=days)
+        deleted, _ = PostChange.objects.filter(created_at__lt=cutoff).delete()
+        self.stdout.write(f"Deleted {deleted} change(s) older than {days} day(s).")
@@ -0,0 +1,20 @@
+# posts/management/commands/response_cache_stats.py
+from django.core.management.base import BaseCommand
+
+from posts.caching import post_response_cache
+
+
+class Command(BaseCommand):
+    help = "Show the hit rate of the posts API response cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Reset the counters after printing.")
+
+    def handle(self, *args, **options):
+        stats = post_response_cache.stats()
+        self.stdout.write(
+            f"hits: {stats['hits']}  misses: {stats['misses']}  "
+            f"hit rate: {stats['hit_rate']:.1%}"
+        )
+        if options["reset"]:
+            post_response_cache.reset_stats()
@@ -0,0 +1,190 @@
+# posts/middleware.py
+import re
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # brotli and zstandard are optional; gzip always works
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+DEFAULTS = {
+    # Server preference when the client accepts several encodings.
+    "ENCODINGS": ["zstd", "br", "gzip"],
+    # Smaller bodies are sent as they are (streams are always compressed).
+    "MIN_SIZE": 512,
+    "LEVELS": {"zstd": 3, "br": 4, "gzip": 6},
+    # No text/html: pages carry the CSRF token next to reflected input,
+    # which compression without padding exposes to BREACH.
+    "CONTENT_TYPES": [
+        r"text/(?!event-stream|html)",
+        r"application/(json|x-ndjson|msgpack|javascript|xml|vnd\.oai\.openapi)",
+        r"application/[\w.+-]*\+(json|xml)",
+        r"text/csv",
+    ],
+}
+
+
+def get_compression_config():
+    return {**DEFAULTS, **getattr(settings, "RESPONSE_COMPRESSION", {})}
+
+
+class GzipCompressor:
+    def __init__(self, level):
+        # wbits=31: zlib stream in a gzip container.
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor:
+    def __init__(self, level):
+        self.compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+class ZstdCompressor:
+    def __init__(self, level):
+        self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        return self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+COMPRESSORS = {"gzip": GzipCompressor}
+if brotli is not None:
+    COMPRESSORS["br"] = BrotliCompressor
+if zstandard is not None:
+    COMPRESSORS["zstd"] = ZstdCompressor
+
+
+def accepted_encodings(header):
+    """
+    Codings from an Accept-Encoding header that are not refused with q=0.
+    """
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        match = re.search(r"q=([\d.]+)", params)
+        try:
+            if match and float(match.group(1)) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def choose_encoding(header, preference):
+    accepted = accepted_encodings(header)
+    for encoding in preference:
+        if encoding in COMPRESSORS and (encoding in accepted or "*" in accepted):
+            return encoding
+    return None
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses with zstd, brotli or gzip, whichever the client
+    accepts first in RESPONSE_COMPRESSION["ENCODINGS"] order (brotli and
+    zstd only when their libraries are installed).
+
+    Only textual and API media types are compressed; event streams are
+    left alone so events are not delayed, and HTML pages (the admin, the
+    browsable API) and any response that rendered the CSRF token are left
+    alone because of BREACH. Bodies under MIN_SIZE, and bodies
+    that would not shrink, are sent uncompressed. Streaming responses
+    (sync or async) are compressed chunk by chunk, flushing after each one
+    so clients still receive data as it is produced.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        config = get_compression_config()
+        self.preference = config["ENCODINGS"]
+        self.min_size = config["MIN_SIZE"]
+        self.levels = config["LEVELS"]
+        self.content_types = re.compile("|".join(f"(?:{pattern})" for pattern in config["CONTENT_TYPES"]))
+
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding"):
+            return response
+        if not self.content_types.match(response.get("Content-Type", "")):
+            return response
+        if settings.CSRF_COOKIE_NAME in response.cookies or request.META.get("CSRF_COOKIE_NEEDS_UPDATE"):
+            # get_token() was called, so the body may contain the token.
+            # CsrfViewMiddleware runs first on the way out: it sets the
+            # cookie and clears CSRF_COOKIE_NEEDS_UPDATE.
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = choose_encoding(request.headers.get("Accept-Encoding", ""), self.preference)
+        if encoding is None:
+            return response
+
+        make_compressor = COMPRESSORS[encoding]
+        level = self.levels[encoding]
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self.compress_async(response.streaming_content, make_compressor(level))
+            else:
+                response.streaming_content = self.compress_stream(response.streaming_content, make_compressor(level))
+            del response["Content-Length"]
+        else:
+            compressor = make_compressor(level)
+            compressed = compressor.compress(response.content) + compressor.finish()
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response["Content-Length"] = str(len(compressed))
+
+        # The compressed body is a different representation: weaken the ETag.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = encoding
+        return response
+
+    @staticmethod
+    def compress_stream(chunks, compressor):
+        for chunk in chunks:
+            yield compressor.compress(chunk) + compressor.flush()
+        yield compressor.finish()
+
+    @staticmethod
+    async def compress_async(chunks, compressor):
+        async for chunk in chunks:
+            yield compressor.compress(chunk) + compressor.flush()
+        yield compressor.finish()
@@ -0,0 +1,107 @@
+# posts/pagination.py
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+class PostCursorPagination(CursorPagination):
+    """
+    Keyset pagination over (created_at, id), newest first.
+
+    Each page is a `WHERE created_at < <cursor>` range read instead of an
+    OFFSET, so deep pages cost the same as the first one and rows inserted
+    while a client is paging do not shift or duplicate results.
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class UserCursorPagination(CursorPagination):
+    """
+    Keyset pagination over the unique username, alphabetical.
+    """
+
+    ordering = ("username",)
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class AsyncPostCursorPagination(PostCursorPagination):
+    """
+    PostCursorPagination for async views: `apaginate_queryset()` reads the
+    page with `aiterator()`. The cursor logic mirrors
+    CursorPagination.paginate_queryset(), split around the one query, so
+    links are interchangeable with the sync endpoint's.
+    """
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page([row async for row in queryset.aiterator()])
+
+    def page_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, self.reverse, self.current_position) = (0, False, None)
+        else:
+            (offset, self.reverse, self.current_position) = self.cursor
+        self.offset = offset
+
+        # Cursor pagination always enforces an ordering.
+        if self.reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if self.current_position is not None:
+            order = self.ordering[0]
+            is_reversed = order.startswith("-")
+            order_attr = order.lstrip("-")
+            if self.cursor.reverse != is_reversed:
+                kwargs = {order_attr + "__lt": self.current_position}
+            else:
+                kwargs = {order_attr + "__gt": self.current_position}
+            queryset = queryset.filter(**kwargs)
+
+        # One extra row tells whether there is a following page.
+        return queryset[offset:offset + self.page_size + 1]
+
+    def set_page(self, results):
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        current_position = self.current_position
+        if self.reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (self.offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (self.offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        return self.page
@@ -1,21 +1,52 @@
 # posts/permissions.py
 from rest_framework import permissions
 
-class IsAuthorOrReadOnly(permissions.BasePermission):
+
+class CachedObjectPermission(permissions.BasePermission):
+    """
+    Base class that remembers object permission decisions for the rest of
+    the request, so views that check the same object more than once (bulk
+    validation, nested serializers) only evaluate it once.
+    """
+
+    def has_object_permission(self, request, view, obj):
+        cache = request.__dict__.setdefault("_object_permission_cache", {})
+        key = (type(self), type(obj), obj.pk, request.method)
+        if key not in cache:
+            cache[key] = self.check_object_permission(request, view, obj)
+        return cache[key]
+
+    def check_object_permission(self, request, view, obj):
+        return True
+
+
+class IsAuthorOrReadOnly(CachedObjectPermission):
     """
     Custom permission to only allow authors of a post to edit or delete it.
     """
 
+    author_field = "author"
+
     def has_permission(self, request, view):
         # Allow access only to authenticated users
         if request.user.is_authenticated:
             return True
         return False
 
-    def has_object_permission(self, request, view, obj):
+    def check_object_permission(self, request, view, obj):
         # Allow read-only access for any request
         if request.method in permissions.SAFE_METHODS:
             return True
 
-        # Write permissions are only allowed to the author of the post
-        return obj.author == request.user
+        # Write permissions are only allowed to the author of the post.
+        # Compare the raw foreign key so the author row is never loaded.
+        return getattr(obj, f"{self.author_field}_id") == request.user.pk
+
+    def filter_queryset(self, request, queryset, view):
+        """
+        Queryset-level form of the same rule: restrict writes to the user's
+        own rows so bulk operations need no per-object checks.
+        """
+        if request.method in permissions.SAFE_METHODS:
+            return queryset
+        return queryset.filter(**{f"{self.author_field}_id": request.user.pk})
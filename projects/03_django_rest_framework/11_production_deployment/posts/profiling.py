@@ -0,0 +1,183 @@
+# posts/profiling.py
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.response import Response
+
+
+DEFAULTS = {
+    "ENABLED": True,
+    # Server-Timing exposes internals, so it is only sent in DEBUG by default.
+    "SERVER_TIMING": None,
+    "BUCKETS": [1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500],
+}
+
+
+def get_profiling_config():
+    config = {**DEFAULTS, **getattr(settings, "API_PROFILING", {})}
+    if config["SERVER_TIMING"] is None:
+        config["SERVER_TIMING"] = settings.DEBUG
+    return config
+
+
+def best_of(func, repeat):
+    """
+    Call `func` `repeat` times; return the fastest wall time in seconds and
+    the last result. Used by the benchmark commands.
+    """
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+class Histograms:
+    """
+    In-process latency histograms per (route, phase), in milliseconds,
+    plus query counts per route. Exposed in the Prometheus text format by
+    posts.views.MetricsView; each worker reports its own numbers.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.buckets = {}
+            self.sums = {}
+            self.counts = {}
+            self.queries = {}
+
+    def observe(self, route, timings, query_count, bounds):
+        with self.lock:
+            for phase, ms in timings.items():
+                key = (route, phase)
+                if key not in self.buckets:
+                    self.buckets[key] = [0] * (len(bounds) + 1)
+                    self.sums[key] = 0.0
+                    self.counts[key] = 0
+                self.buckets[key][bisect_left(bounds, ms)] += 1
+                self.sums[key] += ms
+                self.counts[key] += 1
+            self.queries[route] = self.queries.get(route, 0) + query_count
+
+    def render(self, bounds):
+        name = "api_phase_duration_milliseconds"
+        lines = [f"# TYPE {name} histogram"]
+        with self.lock:
+            for (route, phase), counts in sorted(self.buckets.items()):
+                labels = f'route="{route}",phase="{phase}"'
+                cumulative = 0
+                for bound, count in zip([*bounds, "+Inf"], counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{labels}}} {self.sums[(route, phase)]:.3f}")
+                lines.append(f"{name}_count{{{labels}}} {self.counts[(route, phase)]}")
+            lines.append("# TYPE api_db_queries_total counter")
+            for route, count in sorted(self.queries.items()):
+                lines.append(f'api_db_queries_total{{route="{route}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+histograms = Histograms()
+
+
+class QueryTimer:
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time += time.perf_counter() - start
+            self.count += 1
+
+
+class ProfiledViewMixin:
+    """
+    Time the phases of a DRF request: authentication, permission and
+    throttle checks, database time inside the handler, the rest of the
+    handler (mostly serialization) and rendering.
+
+    Timings feed `histograms` per route (`ViewSet.action`) and, when
+    API_PROFILING["SERVER_TIMING"] is on, a `Server-Timing` header.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        config = get_profiling_config()
+        if not config["ENABLED"]:
+            return super().dispatch(request, *args, **kwargs)
+
+        self.profile_config = config
+        self.phase_timings = dict.fromkeys(("authentication", "permissions", "throttling"), 0.0)
+        self.query_timer = QueryTimer()
+        self.handler_started = None
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self.query_timer))
+            response = super().dispatch(request, *args, **kwargs)
+
+        route = f"{type(self).__name__}.{getattr(self, 'action', None) or request.method.lower()}"
+        histograms.observe(
+            route,
+            {phase: seconds * 1000 for phase, seconds in self.phase_timings.items()},
+            self.query_timer.count,
+            config["BUCKETS"],
+        )
+        return response
+
+    def _timed(self, phase, func, *args, **kwargs):
+        if not hasattr(self, "phase_timings"):
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.phase_timings[phase] = self.phase_timings.get(phase, 0.0) + time.perf_counter() - start
+
+    def perform_authentication(self, request):
+        return self._timed("authentication", super().perform_authentication, request)
+
+    def check_permissions(self, request):
+        return self._timed("permissions", super().check_permissions, request)
+
+    def check_throttles(self, request):
+        return self._timed("throttling", super().check_throttles, request)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if hasattr(self, "phase_timings"):
+            self.handler_started = (time.perf_counter(), self.query_timer.time)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if not hasattr(self, "phase_timings"):
+            return super().finalize_response(request, response, *args, **kwargs)
+
+        if self.handler_started is not None:
+            started, db_before = self.handler_started
+            db = self.query_timer.time - db_before
+            self.phase_timings["db"] = db
+            self.phase_timings["serialize"] = max(time.perf_counter() - started - db, 0.0)
+
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if isinstance(response, Response):
+            # Render now, rather than in Django's handler, so it can be timed.
+            self._timed("render", response.render)
+
+        if self.profile_config["SERVER_TIMING"]:
+            response["Server-Timing"] = ", ".join(
+                [f"{phase};dur={seconds * 1000:.2f}" for phase, seconds in self.phase_timings.items()]
+                + [f'queries;desc="{self.query_timer.count}"']
+            )
+        return response
@@ -0,0 +1,129 @@
+# posts/renderers.py
+import csv
+
+import msgpack
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed.
+
+    The bytes are the same as DRF's compact, non-ASCII-escaped output:
+    datetimes, Decimals, lazy strings and the like are still handed to DRF's
+    JSONEncoder, and U+2028/U+2029 are escaped the same way.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Newline-delimited JSON: one object per line. `render_rows()` encodes an
+    iterable lazily for streaming responses.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = data if isinstance(data, list) else [data]
+        return b"".join(self.render_rows(rows))
+
+    def render_rows(self, rows, fields=None, batch_size=500):
+        encode = FastJSONRenderer().render
+        batch = []
+        for row in rows:
+            batch.append(encode(row) + b"\n")
+            if len(batch) >= batch_size:
+                yield b"".join(batch)
+                batch = []
+        if batch:
+            yield b"".join(batch)
+
+
+class EchoBuffer:
+    # csv.writer needs a file; this one hands back what it is given.
+    def write(self, value):
+        return value
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    CSV with a header row. `render_rows()` encodes an iterable of dicts
+    lazily for streaming responses.
+    """
+
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = data if isinstance(data, list) else [data]
+        fields = list(rows[0]) if rows else []
+        return b"".join(self.render_rows(rows, fields))
+
+    def render_rows(self, rows, fields=None, batch_size=500):
+        writer = csv.writer(EchoBuffer())
+        batch = [writer.writerow(fields)]
+        for row in rows:
+            batch.append(writer.writerow([row[field] for field in fields]))
+            if len(batch) >= batch_size:
+                yield "".join(batch).encode()
+                batch = []
+        if batch:
+            yield "".join(batch).encode()
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets clients negotiate `text/event-stream`. Streams are built by the
+    view; this only renders errors, as a single `error` event.
+    """
+
+    media_type = "text/event-stream"
+    format = "sse"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return b"event: error\ndata: " + FastJSONRenderer().render(data) + b"\n\n"
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    MessagePack, for clients that send `Accept: application/msgpack`.
+
+    Values msgpack has no type for (datetimes, Decimals, UUIDs, lazy
+    strings) are converted the way DRF's JSONEncoder converts them, so the
+    decoded data equals the JSON response's.
+    """
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=JSONEncoder().default)
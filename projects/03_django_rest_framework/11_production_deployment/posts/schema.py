@@ -0,0 +1,141 @@
+# posts/schema.py
+import gzip
+import hashlib
+import logging
+import threading
+
+import yaml
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_safe
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.validation import validate_schema
+
+from .middleware import choose_encoding
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # Written at deploy time with:
+    #   python manage.py spectacular --validate --file schema.yml
+    "PATH": None,
+    # Regenerate once per process and warn if the file is out of date.
+    "CHECK_STALE": None,
+}
+
+def get_schema_config():
+    config = {**DEFAULTS, **getattr(settings, "PRECOMPUTED_SCHEMA", {})}
+    if config["PATH"] is None:
+        config["PATH"] = settings.BASE_DIR / "schema.yml"
+    if config["CHECK_STALE"] is None:
+        config["CHECK_STALE"] = settings.DEBUG
+    return config
+
+
+def generate_schema():
+    """
+    Introspect the API with drf-spectacular, validate the result and return
+    it rendered as YAML, exactly as the `spectacular` command writes it.
+    """
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    schema = generator.get_schema(request=None, public=True)
+    validate_schema(schema)
+    return OpenApiYamlRenderer().render(schema, renderer_context={})
+
+
+class Representation:
+    def __init__(self, content, content_type):
+        self.content = content
+        self.gzipped = gzip.compress(content, mtime=0)
+        self.content_type = content_type
+        digest = hashlib.md5(content, usedforsecurity=False).hexdigest()
+        # Strong ETags name exact bytes, so each encoding gets its own.
+        self.etag = quote_etag(digest)
+        self.gzipped_etag = quote_etag(f"{digest}-gzip")
+
+
+class PrecomputedSchema:
+    """
+    The OpenAPI document, loaded once per process from the file written at
+    deploy time (or generated on first use if there is none) and kept in
+    memory as YAML and JSON, each with a gzipped copy and an ETag per encoding.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.representations = None
+
+    def load(self):
+        config = get_schema_config()
+        try:
+            content = config["PATH"].read_bytes()
+        except FileNotFoundError:
+            logger.warning("%s not found; generating the OpenAPI schema.", config["PATH"])
+            content = generate_schema()
+        else:
+            if config["CHECK_STALE"]:
+                fresh = generate_schema()
+                if fresh != content:
+                    logger.warning(
+                        "%s is out of date with the API; serving a freshly generated "
+                        "schema. Regenerate it with `manage.py spectacular --validate "
+                        "--file %s`.", config["PATH"], config["PATH"].name,
+                    )
+                    content = fresh
+
+        data = yaml.safe_load(content)
+        return {
+            "yaml": Representation(content, OpenApiYamlRenderer.media_type),
+            "json": Representation(
+                OpenApiJsonRenderer().render(data, renderer_context={}),
+                OpenApiJsonRenderer.media_type,
+            ),
+        }
+
+    def get(self, fmt):
+        if self.representations is None:
+            with self.lock:
+                if self.representations is None:
+                    self.representations = self.load()
+        return self.representations[fmt]
+
+    def reset(self):
+        with self.lock:
+            self.representations = None
+
+
+precomputed_schema = PrecomputedSchema()
+
+
+def get_format(request):
+    fmt = request.GET.get("format")
+    if fmt in ("json", "yaml"):
+        return fmt
+    if "json" in request.headers.get("Accept", ""):
+        return "json"
+    return "yaml"
+
+
+@require_safe
+def schema_view(request):
+    """
+    Serve the precomputed schema in place of SpectacularAPIView, without
+    introspecting views, authenticating or throttling.
+    """
+    representation = precomputed_schema.get(get_format(request))
+    gzipped = choose_encoding(request.headers.get("Accept-Encoding", ""), ("gzip",)) == "gzip"
+    etag = representation.gzipped_etag if gzipped else representation.etag
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        if gzipped:
+            response = HttpResponse(representation.gzipped, content_type=representation.content_type)
+            response["Content-Encoding"] = "gzip"
+        else:
+            response = HttpResponse(representation.content, content_type=representation.content_type)
+    response["ETag"] = etag
+    patch_cache_control(response, public=True, no_cache=True)
+    patch_vary_headers(response, ("Accept", "Accept-Encoding"))
+    return response
@@ -1,10 +1,119 @@
 # posts/serializers.py
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from .models import Post
+from .models import Post, PostChange
 
 
-class PostSerializer(serializers.ModelSerializer):
+class SparseFieldsetMixin:
+    """
+    Let GET requests pick a subset of fields with `?fields=id,title`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.requested_fields(self.context.get("request"))
+        if requested is None:
+            return
+
+        unknown = requested - set(self.fields)
+        if unknown:
+            raise serializers.ValidationError(
+                {"fields": f"Unknown field(s): {', '.join(sorted(unknown))}."}
+            )
+        for name in set(self.fields) - requested:
+            self.fields.pop(name)
+
+    @staticmethod
+    def requested_fields(request):
+        if request is None or request.method != "GET":
+            return None
+        fields = request.query_params.get("fields")
+        if not fields:
+            return None
+        return {name.strip() for name in fields.split(",") if name.strip()}
+
+    def get_model_field_names(self):
+        """
+        Model fields needed to render the selected fields, for `.only()`.
+        Expanded to-one relations add their own fields (`author__username`).
+        """
+        names = []
+        for field in self.fields.values():
+            if field.source == "*":
+                continue
+            name = field.source.split(".")[0]
+            names.append(name)
+            if isinstance(field, serializers.Serializer):
+                names.extend(
+                    f"{name}__{child.source.split('.')[0]}"
+                    for child in field.fields.values()
+                    if child.source != "*"
+                )
+        return names
+
+
+class ExpandableFieldsMixin:
+    """
+    Let GET requests replace related ids with nested objects, with
+    `?expand=author`.
+
+    `expandable_fields` maps the names that may be expanded to the
+    serializer used for them. get_related_lookups() gives the
+    select_related() / prefetch_related() lookups the expanded relations
+    need, so views can load them with the objects instead of with a query
+    per object.
+    """
+
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.requested_expansions(self.context.get("request"))
+        unknown = requested - set(self.expandable_fields)
+        if unknown:
+            allowed = ", ".join(sorted(self.expandable_fields)) or "none"
+            raise serializers.ValidationError(
+                {"expand": f"Unknown expansion(s): {', '.join(sorted(unknown))}. Allowed: {allowed}."}
+            )
+        self.expanded = {}
+        for name in requested:
+            relation = self.Meta.model._meta.get_field(name)
+            many = relation.one_to_many or relation.many_to_many
+            self.fields[name] = self.expandable_fields[name](many=many, read_only=True)
+            self.expanded[name] = many
+
+    @staticmethod
+    def requested_expansions(request):
+        if request is None or request.method != "GET":
+            return set()
+        expand = request.query_params.get("expand", "")
+        return {name.strip() for name in expand.split(",") if name.strip()}
+
+    def get_related_lookups(self):
+        """
+        (select_related, prefetch_related) lookups for the expanded fields
+        still in the response.
+        """
+        select_related, prefetch_related = [], []
+        for name, many in self.expanded.items():
+            if name in self.fields:
+                (prefetch_related if many else select_related).append(name)
+        return select_related, prefetch_related
+
+
+class AuthorSerializer(serializers.ModelSerializer):
+    """
+    Expanded `author` of a post.
+    """
+
+    class Meta:
+        model = get_user_model()
+        fields = ("id", "username", "name")
+
+
+class PostSerializer(SparseFieldsetMixin, ExpandableFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {"author": AuthorSerializer}
+
     class Meta:
         model = Post
         fields = (
@@ -13,6 +122,22 @@ class PostSerializer(serializers.ModelSerializer):
             "title",
             "body",
             "created_at",
+            "view_count",
+        )
+
+
+class PostListSerializer(PostSerializer):
+    """
+    List representation without `body`, the only unbounded column.
+    """
+
+    class Meta(PostSerializer.Meta):
+        fields = (
+            "id",
+            "author",
+            "title",
+            "created_at",
+            "view_count",
         )
 
 
@@ -20,3 +145,16 @@ class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = get_user_model()
         fields = ('id', 'username',)
+
+
+class PostChangeSerializer(serializers.ModelSerializer):
+    """
+    Shape of a change feed entry (documentation only: posts/changes.py
+    builds the entries from .values() rows).
+    """
+
+    post = PostSerializer(allow_null=True, read_only=True)
+
+    class Meta:
+        model = PostChange
+        fields = ("id", "action", "post_id", "created_at", "post")
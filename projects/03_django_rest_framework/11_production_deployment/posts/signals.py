@@ -0,0 +1,66 @@
+# posts/signals.py
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_token
+from .caching import invalidate_post, invalidate_posts
+from .changes import record_changes
+from .models import Post, PostChange
+
+
+_batched = ContextVar("batched_post_writes", default=False)
+
+
+@contextmanager
+def batched_post_writes():
+    """
+    Turn the per-post handlers below off inside the block, for bulk writes
+    that record changes and invalidate for the whole batch themselves
+    (such as the one QuerySet.delete() of PostViewSet's bulk delete).
+    """
+    token = _batched.set(True)
+    try:
+        yield
+    finally:
+        _batched.reset(token)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_responses(sender, instance, **kwargs):
+    # Covers the API, the admin and any other code path that calls
+    # save()/delete(); bulk writes must call invalidate_posts() themselves.
+    if not _batched.get():
+        invalidate_post(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def log_post_save(sender, instance, created, **kwargs):
+    if not _batched.get():
+        record_changes(PostChange.CREATED if created else PostChange.UPDATED, [instance.pk])
+
+
+@receiver(post_delete, sender=Post)
+def log_post_delete(sender, instance, **kwargs):
+    if not _batched.get():
+        record_changes(PostChange.DELETED, [instance.pk])
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def invalidate_cached_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_author_posts(sender, instance, created, update_fields=None, **kwargs):
+    # Cached responses with `?expand=author` embed the username and name;
+    # saves that cannot change them (such as last_login on login) are skipped.
+    if created or (update_fields is not None and not {"username", "name"} & set(update_fields)):
+        return
+    invalidate_posts(Post.objects.filter(author=instance).values_list("pk", flat=True))
@@ -1,7 +1,59 @@
 # posts/tests.py
+import gzip
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+import msgpack
+import zstandard
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
-from .models import Post
+from django.contrib.auth.models import AnonymousUser
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.middleware.csrf import CsrfViewMiddleware, get_token
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from .authentication import CachedTokenAuthentication, check_token_cache, token_cache_key
+from .async_views import AsyncPostDetailView
+from .caching import invalidate_post_details, post_response_cache
+from .changes import latest_change_id
+from .counters import WriteBehindCounter
+from .middleware import CompressionMiddleware
+from .models import IdempotencyKey, Post, PostChange
+from .permissions import IsAuthorOrReadOnly
+from .profiling import histograms
+from .schema import generate_schema, precomputed_schema
+from .serializers import PostSerializer
+from .throttling import AnonRateThrottle, ThrottleWeightExceeded
+from .views import PostViewSet
+
+
+def use_view_counter(counter):
+    for view in (PostViewSet, AsyncPostDetailView):
+        mock.patch.object(view, "view_counter", counter).start()
+
+
+def setUpModule():
+    # Views counted in these tests are only written when a test flushes
+    # them, never by the background thread.
+    use_view_counter(WriteBehindCounter(Post, "view_count", background=False))
+
+
+def tearDownModule():
+    mock.patch.stopall()
+
 
 class BlogTests(TestCase):
     @classmethod
@@ -22,3 +74,791 @@ class BlogTests(TestCase):
         self.assertEqual(self.post.title, "A good title")
         self.assertEqual(self.post.body, "Nice body content")
         self.assertEqual(str(self.post), "A good title")
+
+
+class SlidingWindowThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = 1000.0
+        self.request = APIRequestFactory().get("/")
+        self.request.user = AnonymousUser()
+
+    def make_throttle(self):
+        throttle = AnonRateThrottle()
+        throttle.timer = lambda: self.now
+        return throttle
+
+    def test_parse_rate(self):
+        throttle = self.make_throttle()
+        self.assertEqual(throttle.parse_rate("5/5m"), (5, 300))
+        self.assertEqual(throttle.parse_rate("10/minute"), (10, 60))
+        self.assertEqual(throttle.parse_rate("2/day"), (2, 86400))
+
+    def test_limit_slides_with_window(self):
+        AnonRateThrottle.rate = "2/10s"
+        self.addCleanup(delattr, AnonRateThrottle, "rate")
+
+        self.assertTrue(self.make_throttle().allow_request(self.request, None))
+        self.assertTrue(self.make_throttle().allow_request(self.request, None))
+        throttle = self.make_throttle()
+        self.assertFalse(throttle.allow_request(self.request, None))
+        self.assertGreater(throttle.wait(), 0)
+
+        # Halfway into the next window one of the two earlier requests still counts.
+        self.now += 15
+        self.assertTrue(self.make_throttle().allow_request(self.request, None))
+        self.assertFalse(self.make_throttle().allow_request(self.request, None))
+
+    def test_weighted_requests(self):
+        AnonRateThrottle.rate = "5/10s"
+        self.addCleanup(delattr, AnonRateThrottle, "rate")
+        view = mock.Mock(get_throttle_weight=lambda request: 3)
+
+        self.assertTrue(self.make_throttle().allow_request(self.request, view))
+        throttle = self.make_throttle()
+        self.assertFalse(throttle.allow_request(self.request, view))
+        # 3 units must slide out to 2 before another 3 fit under 5.
+        self.assertAlmostEqual(throttle.wait(), 10 + 10 / 3)
+
+        self.now += 10 + 10 / 3 - 0.01
+        self.assertFalse(self.make_throttle().allow_request(self.request, view))
+        self.now += 0.02
+        self.assertTrue(self.make_throttle().allow_request(self.request, view))
+
+        view = mock.Mock(get_throttle_weight=lambda request: 6)
+        with self.assertRaises(ThrottleWeightExceeded):
+            self.make_throttle().allow_request(self.request, view)
+
+
+class PostListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            username="reader",
+            email="reader@email.com",
+            password="secret",
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.user, title=f"Post {i}", body="Long body") for i in range(5)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_is_cursor_paginated_without_body(self):
+        response = self.client.get("/api/v1/", {"page_size": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertNotIn("body", response.data["results"][0])
+
+        next_page = self.client.get(response.data["next"])
+        self.assertEqual(len(next_page.data["results"]), 2)
+        first_ids = {post["id"] for post in response.data["results"]}
+        self.assertFalse(first_ids & {post["id"] for post in next_page.data["results"]})
+
+    def test_values_list_matches_model_serializer(self):
+        response = self.client.get("/api/v1/", {"fields": "id,author,title,body,created_at,view_count"})
+        posts = Post.objects.order_by("-created_at", "-id")
+        expected = JSONRenderer().render(PostSerializer(posts, many=True).data)
+        self.assertEqual(JSONRenderer().render(response.data["results"]), expected)
+
+    def test_sparse_fieldset(self):
+        response = self.client.get("/api/v1/", {"fields": "id,body"})
+        self.assertEqual(set(response.data["results"][0]), {"id", "body"})
+
+        response = self.client.get("/api/v1/", {"fields": "id,nope"})
+        self.assertEqual(response.status_code, 400)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            username="etaguser",
+            email="etag@email.com",
+            password="secret",
+        )
+        cls.post = Post.objects.create(author=cls.user, title="Cached", body="Body")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_detail_not_modified(self):
+        url = f"/api/v1/{self.post.pk}/"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Last-Modified", response)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_malformed_lookup_is_not_found(self):
+        self.assertEqual(self.client.get("/api/v1/abc/").status_code, 404)
+        self.assertEqual(self.client.get(f"/api/v1/{self.post.pk + 1}/").status_code, 404)
+
+    def test_list_etag_changes_on_update(self):
+        etag = self.client.get("/api/v1/")["ETag"]
+        Post.objects.filter(pk=self.post.pk).update(updated_at=timezone.now() + timedelta(seconds=1))
+
+        response = self.client.get("/api/v1/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_list_is_revalidated_after_deleting_an_older_post(self):
+        Post.objects.create(author=self.user, title="Newer", body="Body")
+        response = self.client.get("/api/v1/")
+        self.assertNotIn("Last-Modified", response)
+        self.post.delete()
+
+        stale = {"HTTP_IF_NONE_MATCH": response["ETag"], "HTTP_IF_MODIFIED_SINCE": http_date()}
+        self.assertEqual(self.client.get("/api/v1/", **stale).status_code, 200)
+        self.assertEqual(self.client.get("/api/v1/", HTTP_IF_MODIFIED_SINCE=http_date()).status_code, 200)
+
+
+class ResponseCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            username="cacheuser",
+            email="cache@email.com",
+            password="secret",
+        )
+        cls.post = Post.objects.create(author=cls.user, title="Before", body="Body")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_detail_cached_until_post_saved(self):
+        url = f"/api/v1/{self.post.pk}/"
+        self.assertEqual(self.client.get(url)["X-Cache"], "MISS")
+        self.assertEqual(self.client.get(url)["X-Cache"], "HIT")
+
+        self.post.title = "After"
+        self.post.save()
+        response = self.client.get(url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["title"], "After")
+
+
+class BulkWriteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            username="bulkuser",
+            email="bulk@email.com",
+            password="secret",
+        )
+        cls.other = get_user_model().objects.create_user(
+            username="otheruser",
+            email="other@email.com",
+            password="secret",
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_update_delete(self):
+        response = self.client.post(
+            "/api/v1/bulk/",
+            [{"author": self.user.pk, "title": f"Bulk {i}", "body": "Body"} for i in range(3)],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        ids = list(Post.objects.filter(author=self.user).values_list("id", flat=True))
+        self.assertEqual(len(ids), 3)
+
+        response = self.client.patch(
+            "/api/v1/bulk/", [{"id": pk, "title": "Renamed"} for pk in ids], format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Post.objects.filter(title="Renamed").count(), 3)
+
+        response = self.client.delete("/api/v1/bulk/", {"ids": ids}, format="json")
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Post.objects.filter(id__in=ids).exists())
+
+    def test_bulk_writes_bump_list_version_once(self):
+        ids = [Post.objects.create(author=self.user, title=f"Post {i}", body="Body").pk for i in range(3)]
+        with mock.patch.object(post_response_cache, "bump", wraps=post_response_cache.bump) as bump:
+            self.client.patch("/api/v1/bulk/", [{"id": pk, "title": "Renamed"} for pk in ids], format="json")
+            self.client.delete("/api/v1/bulk/", {"ids": ids}, format="json")
+        self.assertEqual(bump.call_count, 2)
+        for call in bump.call_args_list:
+            self.assertEqual(call.args[0], "list")
+            self.assertCountEqual(call.args[1:], [f"detail:{pk}" for pk in ids])
+
+    def test_bulk_errors_are_reported_per_item(self):
+        theirs = Post.objects.create(author=self.other, title="Theirs", body="Body")
+        response = self.client.patch(
+            "/api/v1/bulk/",
+            [{"id": theirs.pk, "title": "Mine now"}, {"id": 0, "title": "Missing"}],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("detail", response.data["errors"][0])
+        self.assertIn("id", response.data["errors"][1])
+        theirs.refresh_from_db()
+        self.assertEqual(theirs.title, "Theirs")
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "tokens": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "tokens"},
+    },
+)
+class CachedTokenAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            username="tokenuser",
+            email="token@email.com",
+            password="secret",
+        )
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        caches["tokens"].clear()
+        self.auth = CachedTokenAuthentication()
+
+    def test_second_lookup_hits_cache(self):
+        user, token = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(user, self.user)
+        # Only the user is loaded, by primary key, without the token join.
+        with self.assertNumQueries(1):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual((user, token.key), (self.user, self.token.key))
+
+    def test_cache_holds_only_the_user_id(self):
+        self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(caches["tokens"].get(token_cache_key(self.token.key)), self.user.pk)
+        self.assertIsNone(caches["tokens"].get(f"auth_token:{self.token.key}"))
+
+    def test_deactivation_and_rotation_invalidate(self):
+        self.auth.authenticate_credentials(self.token.key)
+        # Another worker deactivates the user: no eviction reaches this one.
+        get_user_model().objects.filter(pk=self.user.pk).update(is_active=False)
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+        get_user_model().objects.filter(pk=self.user.pk).update(is_active=True)
+        key = self.token.key
+        self.auth.authenticate_credentials(key)
+        self.token.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(key)
+
+    def test_process_local_cache_fails_the_check(self):
+        self.assertEqual([error.id for error in check_token_cache(None)], ["posts.E001"])
+        file_cache = {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": "/tmp/tokens"}
+        with self.settings(CACHES={"default": file_cache, "tokens": file_cache}):
+            self.assertEqual(check_token_cache(None), [])
+
+
+class IsAuthorOrReadOnlyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            username="author",
+            email="author@email.com",
+            password="secret",
+        )
+        cls.post = Post.objects.create(author=cls.user, title="Mine", body="Body")
+
+    def test_checks_author_id_without_loading_author(self):
+        request = APIRequestFactory().delete("/")
+        request.user = self.user
+        post = Post.objects.get(pk=self.post.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(IsAuthorOrReadOnly().has_object_permission(request, None, post))
+
+    def test_filter_queryset_limits_writes_to_own_posts(self):
+        other = get_user_model().objects.create_user(username="other", password="secret")
+        request = APIRequestFactory().delete("/")
+        request.user = other
+        queryset = IsAuthorOrReadOnly().filter_queryset(request, Post.objects.all(), None)
+        self.assertFalse(queryset.exists())
+
+
+class ProfilingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_superuser(
+            username="admin", email="admin@email.com", password="secret"
+        )
+        Post.objects.create(author=cls.admin, title="Timed", body="Body")
+
+    def setUp(self):
+        cache.clear()
+        histograms.reset()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_server_timing_and_metrics(self):
+        with self.settings(API_PROFILING={"SERVER_TIMING": True}):
+            response = self.client.get("/api/v1/")
+        phases = [part.split(";")[0] for part in response["Server-Timing"].split(", ")]
+        self.assertEqual(
+            phases,
+            ["authentication", "permissions", "throttling", "db", "serialize", "render", "queries"],
+        )
+
+        metrics = self.client.get("/api/v1/metrics/").content.decode()
+        self.assertIn('api_phase_duration_milliseconds_count{route="PostViewSet.list",phase="db"} 1', metrics)
+        self.assertIn('api_db_queries_total{route="PostViewSet.list"}', metrics)
+
+
+class PrecomputedSchemaTests(TestCase):
+    def setUp(self):
+        precomputed_schema.reset()
+
+    def test_schema_file_is_up_to_date(self):
+        self.assertEqual(generate_schema(), (settings.BASE_DIR / "schema.yml").read_bytes())
+
+    def test_served_gzipped_with_etag(self):
+        with self.settings(PRECOMPUTED_SCHEMA={"CHECK_STALE": False}):
+            response = self.client.get("/api/schema/", HTTP_ACCEPT_ENCODING="gzip")
+            self.assertEqual(response["Content-Encoding"], "gzip")
+            self.assertEqual(
+                gzip.decompress(response.content), (settings.BASE_DIR / "schema.yml").read_bytes()
+            )
+
+            self.assertIn("Accept-Encoding", response["Vary"])
+            gzipped_etag = response["ETag"]
+            response = self.client.get("/api/schema/", HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=gzipped_etag)
+            self.assertEqual(response.status_code, 304)
+
+            # The identity body has its own ETag, and q=0 refuses gzip.
+            response = self.client.get("/api/schema/", HTTP_ACCEPT_ENCODING="gzip;q=0, identity")
+            self.assertNotIn("Content-Encoding", response)
+            self.assertNotEqual(response["ETag"], gzipped_etag)
+            response = self.client.get("/api/schema/", HTTP_IF_NONE_MATCH=gzipped_etag)
+            self.assertEqual(response.status_code, 200)
+
+            response = self.client.get("/api/schema/?format=json")
+            self.assertEqual(response.json()["info"]["title"], "Blog API Project")
+
+
+class StreamingExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username="reader", password="secret")
+        cls.admin = get_user_model().objects.create_superuser(
+            username="boss", email="boss@email.com", password="secret"
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.user, title=f"Post {i}", body="Body") for i in range(3)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_posts_ndjson_and_csv(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get("/api/v1/export/")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).splitlines()
+        self.assertEqual([json.loads(line)["title"] for line in lines], ["Post 0", "Post 1", "Post 2"])
+
+        response = self.client.get("/api/v1/export/?format=csv&fields=id,title")
+        rows = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(rows[0], "id,title")
+        self.assertEqual(len(rows), 4)
+
+    def test_users_export_is_admin_only(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get("/api/v1/users/export/").status_code, 403)
+        self.client.force_authenticate(self.admin)
+        response = self.client.get("/api/v1/users/export/", HTTP_ACCEPT="text/csv")
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        rows = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(rows, ["id,username", f"{self.user.pk},reader", f"{self.admin.pk},boss"])
+
+
+class AsyncReadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username="async", password="secret")
+        cls.token = Token.objects.create(user=cls.user)
+        cls.post = Post.objects.create(author=cls.user, title="Async", body="Body")
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_matches_sync_endpoints(self):
+        headers = {"authorization": f"Token {self.token.key}"}
+        for sync_url, async_url in [
+            ("/api/v1/", "/api/v1/async/"),
+            ("/api/v1/?fields=id,body", "/api/v1/async/?fields=id,body"),
+            (f"/api/v1/{self.post.pk}/", f"/api/v1/async/{self.post.pk}/"),
+        ]:
+            await cache.aclear()  # Stay under the five-per-five-minute throttle.
+            expected = (await self.async_client.get(sync_url, headers=headers)).json()
+            response = await self.async_client.get(async_url, headers=headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json().get("results", response.json()), expected.get("results", expected))
+
+    async def test_permissions_and_throttling(self):
+        self.assertEqual((await self.async_client.get("/api/v1/async/")).status_code, 403)
+        headers = {"authorization": f"Token {self.token.key}"}
+        self.assertEqual(
+            (await self.async_client.get("/api/v1/async/0/", headers=headers)).status_code, 404
+        )
+        statuses = [
+            (await self.async_client.get("/api/v1/async/", headers=headers)).status_code
+            for _ in range(5)
+        ]
+        self.assertEqual(statuses, [200, 200, 200, 200, 429])
+
+
+@override_settings(POSTS_CHANGE_FEED={"COMMIT_LAG": 0})
+class ChangeFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username="follower", password="secret")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_changes_since_cursor(self):
+        post = Post.objects.create(author=self.user, title="First", body="Body")
+        post.title = "Edited"
+        post.save()
+        response = self.client.get("/api/v1/changes/")
+        changes = response.json()["changes"]
+        self.assertEqual([c["action"] for c in changes], ["created", "updated"])
+        self.assertEqual(changes[1]["post"]["title"], "Edited")
+
+        cursor = response.json()["cursor"]
+        post.delete()
+        response = self.client.get(f"/api/v1/changes/?since={cursor}")
+        self.assertEqual(
+            [(c["action"], c["post"]) for c in response.json()["changes"]], [("deleted", None)]
+        )
+        self.assertEqual(self.client.get("/api/v1/changes/?since=x").status_code, 400)
+
+    def test_bulk_writes_are_logged(self):
+        response = self.client.post(
+            "/api/v1/bulk/",
+            [{"author": self.user.pk, "title": f"Bulk {i}", "body": "Body"} for i in range(2)],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            list(PostChange.objects.values_list("action", flat=True)), ["created", "created"]
+        )
+
+        ids = [post["id"] for post in response.json()]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.delete("/api/v1/bulk/", {"ids": ids}, format="json")
+        self.assertEqual(response.status_code, 204)
+        inserts = [q for q in queries if q["sql"].startswith('INSERT INTO "posts_postchange"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(
+            list(PostChange.objects.values_list("action", flat=True)), ["created"] * 2 + ["deleted"] * 2
+        )
+
+    def test_event_stream_resumes_from_last_event_id(self):
+        first = Post.objects.create(author=self.user, title="One", body="Body")
+        Post.objects.create(author=self.user, title="Two", body="Body")
+        since = PostChange.objects.get(post_id=first.pk).id
+        with self.settings(POSTS_CHANGE_FEED={"MAX_SYNC_STREAM_SECONDS": 0, "COMMIT_LAG": 0}):
+            response = self.client.get(
+                "/api/v1/changes/stream/", HTTP_ACCEPT="text/event-stream", HTTP_LAST_EVENT_ID=str(since)
+            )
+            body = b"".join(response.streaming_content).decode()
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = [block for block in body.split("\n\n") if block.startswith("id:")]
+        self.assertEqual(len(events), 1)
+        self.assertIn('"title":"Two"', events[0])
+
+    def test_changes_wait_out_the_commit_lag(self):
+        posts = [Post.objects.create(author=self.user, title=f"Post {i}", body="Body") for i in range(3)]
+        changes = list(PostChange.objects.all())
+        old = timezone.now() - timedelta(seconds=10)
+        # The middle change was logged last, as by a slower transaction.
+        PostChange.objects.filter(id__in=[changes[0].id, changes[2].id]).update(created_at=old)
+
+        with self.settings(POSTS_CHANGE_FEED={"COMMIT_LAG": 5}):
+            page = self.client.get("/api/v1/changes/").json()
+            self.assertEqual([c["post_id"] for c in page["changes"]], [posts[0].pk])
+            self.assertFalse(page["has_more"])
+            self.assertEqual(latest_change_id(), changes[0].id)
+
+            PostChange.objects.filter(id=changes[1].id).update(created_at=old)
+            page = self.client.get(f"/api/v1/changes/?since={page['cursor']}").json()
+            self.assertEqual([c["post_id"] for c in page["changes"]], [posts[1].pk, posts[2].pk])
+            self.assertEqual(latest_change_id(), changes[2].id)
+
+
+class MessagePackAndCompressionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username="packer", password="secret")
+        Post.objects.bulk_create(
+            Post(author=cls.user, title=f"Post {i}", body="Body " * 20) for i in range(20)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_msgpack_round_trip(self):
+        response = self.client.get("/api/v1/?fields=id,title", HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        as_json = self.client.get("/api/v1/?fields=id,title").json()
+        self.assertEqual(msgpack.unpackb(response.content), as_json)
+
+        response = self.client.post(
+            "/api/v1/",
+            msgpack.packb({"author": self.user.pk, "title": "Packed", "body": "Binary body"}),
+            content_type="application/msgpack",
+            HTTP_ACCEPT="application/msgpack",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(msgpack.unpackb(response.content)["title"], "Packed")
+
+        response = self.client.post("/api/v1/", b"\xc1", content_type="application/msgpack")
+        self.assertEqual(response.status_code, 400)
+
+    def test_encoding_follows_accept_encoding(self):
+        response = self.client.get("/api/v1/", HTTP_ACCEPT_ENCODING="gzip, br, zstd")
+        self.assertEqual(response["Content-Encoding"], "zstd")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        body = zstandard.ZstdDecompressor().decompressobj().decompress(response.content)
+        self.assertEqual(json.loads(body)["results"][0]["title"], "Post 19")
+
+        response = self.client.get("/api/v1/", HTTP_ACCEPT_ENCODING="gzip, zstd;q=0")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))["results"]), 20)
+
+        # Below MIN_SIZE, or without Accept-Encoding, the body is sent as is.
+        post = Post.objects.first()
+        response = self.client.get(f"/api/v1/{post.pk}/?fields=id", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertFalse(self.client.get("/api/v1/").has_header("Content-Encoding"))
+
+    def test_html_and_csrf_responses_are_not_compressed(self):
+        response = self.client.get("/api/v1/", HTTP_ACCEPT="text/html", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(len(response.content), 512)
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+        def view(request):
+            return HttpResponse(json.dumps({"csrf": get_token(request), "pad": "x" * 1024}), content_type="application/json")
+
+        # In settings.MIDDLEWARE order, so CsrfViewMiddleware sees the
+        # response first.
+        handler = CompressionMiddleware(CsrfViewMiddleware(view))
+        response = handler(APIRequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip"))
+        self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_streaming_export_is_compressed(self):
+        response = self.client.get("/api/v1/export/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        lines = gzip.decompress(b"".join(response.streaming_content)).splitlines()
+        self.assertEqual(len(lines), 20)
+
+
+class IdempotencyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username="retrier", password="secret")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.data = {"author": self.user.pk, "title": "Once", "body": "Only once"}
+
+    def post(self, key, data=None):
+        return self.client.post("/api/v1/", data or self.data, format="json", HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retries_replay_without_db_or_throttle(self):
+        first = self.post("abc")
+        self.assertEqual(first.status_code, 201)
+        # Well past the 5/5m write throttle.
+        for _ in range(6):
+            with self.assertNumQueries(0):
+                retry = self.post("abc")
+            self.assertEqual(retry.status_code, 201)
+            self.assertEqual(retry["Idempotent-Replayed"], "true")
+            self.assertEqual(retry.json(), first.json())
+        self.assertEqual(Post.objects.count(), 1)
+
+        # Another worker (empty cache) replays from the table.
+        cache.clear()
+        self.assertEqual(self.post("abc").json(), first.json())
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_key_reuse_and_in_progress(self):
+        self.post("abc")
+        self.assertEqual(self.post("abc", {**self.data, "title": "Other"}).status_code, 422)
+
+        IdempotencyKey.objects.create(
+            user=self.user, key="running", fingerprint="x", expires_at=timezone.now() + timedelta(hours=1)
+        )
+        self.assertEqual(self.post("running").status_code, 409)
+
+    def test_failed_requests_release_key_and_prune(self):
+        self.assertEqual(self.post("abc", {"title": ""}).status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.post("abc").status_code, 201)
+
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        call_command("prune_idempotency_keys", stdout=StringIO())
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+
+class ExpandTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        authors = [
+            get_user_model().objects.create_user(username=f"writer{i}", password="secret", name=f"Writer {i}")
+            for i in range(5)
+        ]
+        cls.user = authors[0]
+        Post.objects.bulk_create(
+            Post(author=authors[i % 5], title=f"Post {i}", body="Body") for i in range(30)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_expanded_author(self):
+        post = Post.objects.filter(author=self.user).first()
+        response = self.client.get(f"/api/v1/{post.pk}/?expand=author")
+        expected = {"id": self.user.pk, "username": "writer0", "name": "Writer 0"}
+        self.assertEqual(response.json()["author"], expected)
+        self.assertNotIn("ETag", response)
+
+        response = self.client.get("/api/v1/?expand=author&fields=id,author")
+        self.assertEqual(list(response.json()["results"][0]), ["id", "author"])
+        self.assertEqual(set(response.json()["results"][0]["author"]), {"id", "username", "name"})
+
+        # Renaming the author invalidates cached expanded responses.
+        self.user.name = "Renamed"
+        self.user.save()
+        response = self.client.get(f"/api/v1/{post.pk}/?expand=author")
+        self.assertEqual(response.json()["author"]["name"], "Renamed")
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        def queries(page_size):
+            cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(f"/api/v1/?expand=author&page_size={page_size}")
+            self.assertEqual(len(response.json()["results"]), page_size)
+            return len(context.captured_queries)
+
+        self.assertEqual(queries(2), queries(25))
+
+    def test_unknown_expansion_is_rejected(self):
+        response = self.client.get("/api/v1/?expand=author,comments")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("comments", response.json()["expand"])
+
+
+class ViewCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username="viewer", password="secret")
+        cls.posts = Post.objects.bulk_create(
+            Post(author=cls.user, title=f"Post {i}", body="Body") for i in range(3)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.counter = WriteBehindCounter(Post, "view_count", on_flush=invalidate_post_details, background=False)
+        for view in (PostViewSet, AsyncPostDetailView):
+            patcher = mock.patch.object(view, "view_counter", self.counter)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_views_are_buffered_then_flushed_in_one_update(self):
+        first, second, third = self.posts
+        with self.settings(POSTS_VIEW_COUNTS={"FLUSH_INTERVAL": 3600, "MAX_PENDING": 1000}):
+            for post in (first, first, second):
+                response = self.client.get(f"/api/v1/{post.pk}/")
+                self.assertEqual(response.status_code, 200)
+            # Cached and not-modified responses count too; misses do not.
+            self.assertEqual(self.client.get(f"/api/v1/{first.pk}/")["X-Cache"], "HIT")
+            response = self.client.get(f"/api/v1/{second.pk}/", HTTP_IF_NONE_MATCH=response["ETag"])
+            self.assertEqual(response.status_code, 304)
+            cache.clear()  # FivePerFiveMinuteThrottle allows five requests
+            stale = self.client.get(f"/api/v1/{first.pk}/")
+            self.assertEqual(self.client.get("/api/v1/999999/").status_code, 404)
+        self.assertEqual(Post.objects.get(pk=first.pk).view_count, 0)
+
+        with mock.patch.object(post_response_cache, "bump", wraps=post_response_cache.bump) as bump:
+            with self.assertNumQueries(1):
+                self.assertEqual(self.counter.flush(), 2)
+        # Only the flushed details: list pages keep their cached copies.
+        bump.assert_called_once_with(f"detail:{first.pk}", f"detail:{second.pk}")
+        counts = dict(Post.objects.values_list("pk", "view_count"))
+        self.assertEqual(counts, {first.pk: 4, second.pk: 2, third.pk: 0})
+
+        # The flush invalidates cached details and changes their validators.
+        response = self.client.get(f"/api/v1/{first.pk}/", HTTP_IF_NONE_MATCH=stale["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()["view_count"], 4)
+        response = self.client.get("/api/v1/?fields=id,view_count")
+        self.assertIn({"id": first.pk, "view_count": 4}, response.json()["results"])
+
+    def test_max_pending_triggers_flush(self):
+        post = self.posts[0]
+        with self.settings(POSTS_VIEW_COUNTS={"FLUSH_INTERVAL": 3600, "MAX_PENDING": 3}):
+            for _ in range(4):
+                self.counter.record(post.pk)
+        self.assertEqual(Post.objects.get(pk=post.pk).view_count, 3)
+        self.assertEqual(self.counter.flush(), 1)
+        self.assertEqual(Post.objects.get(pk=post.pk).view_count, 4)
+
+    def test_idle_buffer_is_flushed_in_the_background(self):
+        counter = WriteBehindCounter(Post, "view_count")
+        with self.settings(POSTS_VIEW_COUNTS={"FLUSH_INTERVAL": 0.05, "MAX_PENDING": 1000}):
+            with mock.patch.object(counter, "flush", side_effect=counter.pending.clear) as flush:
+                counter.add(self.posts[0].pk)
+                timer = counter.timer
+                timer.join()
+        flush.assert_called_once_with()
+        self.assertIsNone(counter.timer)
+
+
+class LoadTestCommandTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_runs_throttle_free_and_removes_only_its_rows(self):
+        bystander = get_user_model().objects.create_user(username="loadtest-0")
+        out = StringIO()
+        call_command(
+            "load_test", users=2, posts=4, requests=12, concurrency=1, interface="asgi",
+            mix="list=1,detail=1,create=1,update=1", stdout=out,
+        )
+        output = out.getvalue()
+        self.assertIn("12 requests in", output)
+        # The 5/5m post throttle would have rejected most of these.
+        self.assertNotIn("429", output)
+        self.assertEqual(list(get_user_model().objects.values_list("username", flat=True)), ["loadtest-0"])
+        self.assertFalse(Post.objects.exists())
+        self.assertEqual(api_settings.DEFAULT_THROTTLE_RATES["five_per_five_minute"], "5/5m")
+        bystander.delete()
@@ -1,40 +1,232 @@
 # posts/throttling.py
-from rest_framework.throttling import SimpleRateThrottle
+import re
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache as default_cache
 from django.core.exceptions import ImproperlyConfigured
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .caching import is_local_cache
+
+
+class ThrottleWeightExceeded(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "This request costs more throttle units than the rate allows."
+    default_code = "throttle_weight_exceeded"
+
+
+class SlidingWindowRateThrottle(BaseThrottle):
+    """
+    Sliding-window counter throttle.
+
+    DRF's SimpleRateThrottle keeps a list with every request timestamp in the
+    cache and rewrites it on each request. Here each client only has two
+    integer counters, one for the current fixed window and one for the
+    previous window, and the request count over the last `duration` seconds
+    is estimated by weighting the previous window by how much of it still
+    overlaps. Counters are updated with cache.incr(), which is atomic on the
+    local-memory, memcached and redis backends (the file backend does a
+    read-modify-write, so concurrent workers can slightly undercount).
+    """
+
+    cache = default_cache
+    timer = time.time
+    cache_format = "throttle_%(scope)s_%(ident)s_%(window)d"
+    scope = None
+    # None reads DEFAULT_THROTTLE_RATES per request, so overriding the
+    # REST_FRAMEWORK setting takes effect without a restart.
+    THROTTLE_RATES = None
 
-class FivePerFiveMinuteThrottle(SimpleRateThrottle):
-    scope = 'five_per_five_minute'
+    duration_mapping = {
+        "s": 1,
+        "m": 60,
+        "h": 3600,
+        "d": 86400,
+    }
+
+    def __init__(self):
+        if not getattr(self, "rate", None):
+            self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+
+    def get_rate(self):
+        if not getattr(self, "scope", None):
+            raise ImproperlyConfigured(
+                f"You must set either `.scope` or `.rate` for '{self.__class__.__name__}' throttle"
+            )
+        try:
+            rates = self.THROTTLE_RATES
+            if rates is None:
+                rates = api_settings.DEFAULT_THROTTLE_RATES
+            return rates[self.scope]
+        except KeyError:
+            raise ImproperlyConfigured(
+                f"No default throttle rate set for '{self.scope}' scope"
+            )
 
     def parse_rate(self, rate):
         """
-        Override the parse_rate method to handle rates like '5/5m'.
+        Parse rates like '5/5m', '10/minute' or '2/day' into
+        (num_requests, duration_in_seconds).
         """
+        if rate is None:
+            return (None, None)
         try:
-            num, period = rate.split('/')
-            num = int(num)
-
-            # Extract the numeric part and the unit from the period
-            duration_number = int(period[:-1])
-            duration_unit = period[-1]
-
-            # Map the unit to seconds
-            duration_mapping = {
-                's': 1,
-                'm': 60,
-                'h': 3600,
-                'd': 86400,
-            }
-
-            if duration_unit not in duration_mapping:
+            num, period = rate.split("/")
+            match = re.fullmatch(r"(\d*)\s*([a-zA-Z]+)", period.strip())
+            if match is None:
+                raise ValueError(f"Invalid period: {period}")
+            duration_number = int(match.group(1) or 1)
+            duration_unit = match.group(2)[0].lower()
+
+            if duration_unit not in self.duration_mapping:
                 raise ValueError(f"Invalid duration unit: {duration_unit}")
 
-            duration = duration_mapping[duration_unit] * duration_number
-            return (num, duration)
-        except (ValueError, KeyError) as e:
+            return (int(num), self.duration_mapping[duration_unit] * duration_number)
+        except ValueError as e:
             raise ImproperlyConfigured(
                 f"Invalid throttle rate '{rate}'. Expected format '<number>/<duration>', e.g., '5/5m'. Error: {e}"
             )
 
+    def get_cache_key(self, request, view):
+        raise NotImplementedError(".get_cache_key() must be overridden")
+
+    def window_key(self, window):
+        return self.cache_format % {
+            "scope": self.scope,
+            "ident": self.ident,
+            "window": window,
+        }
+
+    def increment(self, key, delta=1):
+        # add() only writes if the key is missing, so concurrent first hits
+        # cannot reset each other's counts; incr() is then atomic.
+        self.cache.add(key, 0, timeout=self.duration * 2)
+        try:
+            return self.cache.incr(key, delta)
+        except ValueError:
+            # The key expired between add() and incr().
+            self.cache.set(key, delta, timeout=self.duration * 2)
+            return delta
+
+    def get_weight(self, request, view):
+        """
+        Number of units this request consumes; views can charge more for
+        expensive requests (such as bulk writes) with get_throttle_weight().
+        """
+        get_throttle_weight = getattr(view, "get_throttle_weight", None)
+        return get_throttle_weight(request) if get_throttle_weight else 1
+
+    def allow_request(self, request, view):
+        if self.num_requests is None:
+            return True
+
+        self.ident = self.get_cache_key(request, view)
+        if self.ident is None:
+            return True
+
+        self.weight = weight = self.get_weight(request, view)
+        if weight > self.num_requests:
+            # It would never be allowed, so waiting cannot help.
+            raise ThrottleWeightExceeded(
+                f"This request costs {weight} throttle units; at most "
+                f"{self.num_requests} are allowed per {self.duration} seconds."
+            )
+
+        now = self.timer()
+        window = int(now // self.duration)
+        self.elapsed = now - window * self.duration
+        current_key = self.window_key(window)
+
+        self.previous_count = self.cache.get(self.window_key(window - 1), 0)
+        self.current_count = self.increment(current_key, weight)
+        if self.estimate(self.current_count) <= self.num_requests:
+            return True
+
+        # Roll back so rejected requests do not keep the client locked out.
+        self.cache.decr(current_key, weight)
+        self.current_count -= weight
+        return False
+
+    def estimate(self, current_count):
+        overlap = (self.duration - self.elapsed) / self.duration
+        return self.previous_count * overlap + current_count
+
+    def wait(self):
+        """
+        Seconds until the estimate drops enough for this request's weight.
+        """
+        room = self.num_requests - self.weight - self.current_count
+        if room >= 0:
+            # Waiting for the previous window to slide out far enough.
+            if not self.previous_count:
+                return 0
+            needed = self.duration * (1 - room / self.previous_count)
+            return max(needed - self.elapsed, 0)
+        # The current window alone is over the limit: wait for it to become
+        # the previous window and slide out.
+        remaining = self.duration - self.elapsed
+        allowed = self.num_requests - self.weight
+        return remaining + self.duration * (1 - allowed / self.current_count)
+
+    async def aallow_request(self, request, view):
+        """
+        allow_request() for async views. Django's cache backends implement
+        their async methods by running the sync ones in a thread, so instead
+        of one such hop per cache call this makes one for the whole check,
+        or none for the local-memory cache, which never blocks.
+        """
+        if is_local_cache(self.cache):
+            return self.allow_request(request, view)
+        return await sync_to_async(self.allow_request)(request, view)
+
+
+class AnonRateThrottle(SlidingWindowRateThrottle):
+    """
+    Limits the rate of API calls made by anonymous users, keyed by IP.
+    """
+
+    scope = "anon"
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None  # Only throttle unauthenticated requests
+        return self.get_ident(request)
+
+
+class UserRateThrottle(SlidingWindowRateThrottle):
+    """
+    Limits the rate of API calls made by a user, or by IP for anonymous users.
+    """
+
+    scope = "user"
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return self.get_ident(request)
+
+
+class BurstRateThrottle(UserRateThrottle):
+    scope = "burst"
+
+
+class ChangeFeedRateThrottle(UserRateThrottle):
+    """
+    Own budget for the change feed, so following it does not use up the
+    per-user allowance of the posts endpoints.
+    """
+
+    scope = "changes"
+
+
+class FivePerFiveMinuteThrottle(SlidingWindowRateThrottle):
+    scope = "five_per_five_minute"
+
     def get_cache_key(self, request, view):
         """
         Generate a unique cache key based on the user's unique identifier.
@@ -42,8 +234,4 @@ class FivePerFiveMinuteThrottle(SimpleRateThrottle):
         if not request.user.is_authenticated:
             return None  # Only throttle authenticated users
 
-        ident = self.get_ident(request)  # Typically the user's ID or IP
-        return self.cache_format % {
-            'scope': self.scope,
-            'ident': ident
-        }
+        return self.get_ident(request)  # Typically the user's ID or IP
@@ -1,12 +1,21 @@
 # posts/urls.py
 from django.urls import path
-from .views import UserViewSet, PostViewSet
+from .async_views import AsyncPostDetailView, AsyncPostListView
+from .views import MetricsView, PostChangeStreamView, PostChangesView, UserViewSet, PostViewSet
 from rest_framework.routers import SimpleRouter
 # from .views import PostList, PostDetail, UserList, UserDetail  # new
 router = SimpleRouter()
 router.register("users", UserViewSet, basename="users") 
 router.register("", PostViewSet, basename="posts")
-urlpatterns = router.urls
+# Before the router, whose post detail pattern would also match these.
+urlpatterns = [
+    path("metrics/", MetricsView.as_view(), name="metrics"),
+    path("changes/", PostChangesView.as_view(), name="post_changes"),
+    path("changes/stream/", PostChangeStreamView.as_view(), name="post_change_stream"),
+    # Async read-only path for ASGI deployments; writes use the viewset.
+    path("async/", AsyncPostListView.as_view(), name="async_post_list"),
+    path("async/<int:pk>/", AsyncPostDetailView.as_view(), name="async_post_detail"),
+] + router.urls
 # urlpatterns = [
 #     path("users/", UserList.as_view()),  # new
 #     path("users/<int:pk>/", UserDetail.as_view()),  # new
@@ -1,12 +1,33 @@
 # posts/views.py
 # from rest_framework import generics
 from django.contrib.auth import get_user_model
-from rest_framework.permissions import IsAdminUser
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_view, inline_serializer
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework import viewsets  # new
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from accounts.search import UserSearchFilter
 from .models import Post
-from .serializers import PostSerializer, UserSerializer
+from .bulk import BulkWriteMixin
+from .caching import ResponseCacheMixin, invalidate_posts, post_response_cache
+from .changes import ChangeStream, changes_since, get_feed_config, latest_change_id, record_changes
+from .conditional import ConditionalGetMixin
+from .counters import ViewCountMixin, view_counter
+from .export import StreamingExportMixin
+from .fast_serializers import ValuesSerializer
+from .idempotency import IdempotencyMixin
+from .pagination import PostCursorPagination, UserCursorPagination
+from .profiling import ProfiledViewMixin, get_profiling_config, histograms
+from .renderers import EventStreamRenderer, FastJSONRenderer, MessagePackRenderer
+from .serializers import PostChangeSerializer, PostListSerializer, PostSerializer, UserSerializer
+from .signals import batched_post_writes
 from .permissions import IsAuthorOrReadOnly
-from .throttling import FivePerFiveMinuteThrottle  # Import custom throttle
+from .throttling import ChangeFeedRateThrottle, FivePerFiveMinuteThrottle  # Import custom throttle
 
 # class PostList(generics.ListCreateAPIView):
 #     permission_classes = (IsAuthorOrReadOnly,)
@@ -21,17 +42,191 @@ from .throttling import FivePerFiveMinuteThrottle  # Import custom throttle
 #     serializer_class = PostSerializer
 
 
-class PostViewSet(viewsets.ModelViewSet):  # new
+class ValuesListMixin:
+    """
+    Serve `list` from `.values()` rows through a compiled ValuesSerializer
+    instead of building a model instance and running every serializer field
+    per object. The response body is the same as the ModelSerializer's.
+    """
+
+    def list(self, request, *args, **kwargs):
+        reader = ValuesSerializer.for_serializer(self.get_serializer())
+        keys = list(reader.sources)
+        if self.pagination_class is not None and hasattr(self.pagination_class, "ordering"):
+            # The cursor is built from the ordering fields of the last row.
+            keys += [field.lstrip("-") for field in self.pagination_class.ordering]
+        queryset = self.filter_queryset(self.get_queryset()).values(*dict.fromkeys(keys))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(reader.many(page))
+        return Response(reader.many(queryset))
+
+
+expand_parameter = OpenApiParameter(
+    "expand", str, enum=["author"], description="Replace `author` with the user's id, username and name."
+)
+
+
+@extend_schema_view(
+    list=extend_schema(parameters=[expand_parameter]),
+    retrieve=extend_schema(parameters=[expand_parameter]),
+)
+class PostViewSet(
+    ProfiledViewMixin,
+    StreamingExportMixin,
+    IdempotencyMixin,
+    BulkWriteMixin,
+    ViewCountMixin,
+    ConditionalGetMixin,
+    ResponseCacheMixin,
+    ValuesListMixin,
+    viewsets.ModelViewSet,
+):  # new
     permission_classes = (IsAuthorOrReadOnly,)
     throttle_classes = (FivePerFiveMinuteThrottle,)
     queryset = Post.objects.all()
     serializer_class = PostSerializer
+    pagination_class = PostCursorPagination
+    response_cache = post_response_cache
+    view_counter = view_counter
+    counter_fields = ("view_count",)  # flushed without touching updated_at
+    unvalidated_params = ("expand",)  # post timestamps do not cover the author
+
+    def get_serializer_class(self):
+        # Lists leave out `body` unless the client picks fields explicitly.
+        if self.action == "list" and "fields" not in self.request.query_params:
+            return PostListSerializer
+        return PostSerializer
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method != "GET":
+            return queryset
+        # Only SELECT the columns the response will contain, plus the
+        # pagination keys the cursor is built from, and load expanded
+        # relations with the posts.
+        serializer = self.get_serializer()
+        select_related, prefetch_related = serializer.get_related_lookups()
+        fields = serializer.get_model_field_names()
+        ordering = [field.lstrip("-") for field in self.pagination_class.ordering]
+        return (
+            queryset.select_related(*select_related)
+            .prefetch_related(*prefetch_related)
+            .only(*fields, *ordering)
+        )
 
-class UserViewSet(viewsets.ModelViewSet):  # new
+    def invalidate_objects(self, pks):
+        invalidate_posts(pks)
+
+    def bulk_destroy(self, request, items):
+        # The batch records its changes and invalidates once; the post_delete
+        # handlers would do both per post.
+        with batched_post_writes():
+            return super().bulk_destroy(request, items)
+
+    def record_changes(self, action, pks):
+        record_changes(action, pks)
+
+
+class UserViewSet(
+    ProfiledViewMixin, StreamingExportMixin, ValuesListMixin, viewsets.ModelViewSet
+):  # new
     permission_classes = [IsAdminUser]
     queryset = get_user_model().objects.all()
     serializer_class = UserSerializer
+    pagination_class = UserCursorPagination
+    filter_backends = [UserSearchFilter]  # ?search=
+
+
+class MetricsView(APIView):
+    """
+    Per-route phase latency histograms and query counts of this worker
+    process, in the Prometheus text exposition format.
+    """
+
+    permission_classes = [IsAdminUser]
+    throttle_classes = []  # Scrapers poll on a fixed schedule.
+    schema = None  # Not part of the public API.
+
+    def get(self, request, *args, **kwargs):
+        body = histograms.render(get_profiling_config()["BUCKETS"])
+        return HttpResponse(body, content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def get_change_cursor(request, default):
+    """
+    The `since` query parameter, else the Last-Event-ID header an
+    EventSource sends when it reconnects, else `default`.
+    """
+    value = request.query_params.get("since", request.headers.get("Last-Event-ID"))
+    if value is None:
+        return default
+    try:
+        since = int(value)
+    except ValueError:
+        since = -1
+    if since < 0:
+        raise ValidationError({"since": "Expected a change id (a non-negative integer)."})
+    return since
+
+
+since_parameter = OpenApiParameter(
+    "since", int, description="Return changes after this change id (default: from the start)."
+)
+
+
+class PostChangesView(APIView):
+    """
+    The next page of post changes after `?since=`, oldest first. Pass the
+    returned `cursor` as `since` to continue.
+    """
+
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [ChangeFeedRateThrottle]
+    renderer_classes = (FastJSONRenderer, MessagePackRenderer, BrowsableAPIRenderer)
+
+    @extend_schema(
+        parameters=[since_parameter],
+        responses=inline_serializer(
+            "PostChangePage",
+            {
+                "cursor": serializers.IntegerField(),
+                "has_more": serializers.BooleanField(),
+                "changes": PostChangeSerializer(many=True),
+            },
+        ),
+    )
+    def get(self, request, *args, **kwargs):
+        since = get_change_cursor(request, default=0)
+        changes, has_more = changes_since(since, get_feed_config()["PAGE_SIZE"])
+        return Response({
+            "cursor": changes[-1]["id"] if changes else since,
+            "has_more": has_more,
+            "changes": changes,
+        })
+
+
+class PostChangeStreamView(APIView):
+    """
+    Server-sent events with each post change after `?since=` or
+    Last-Event-ID (default: only changes from now on).
+    """
+
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [ChangeFeedRateThrottle]
+    renderer_classes = (EventStreamRenderer,)
+    schema = None  # An event stream, not describable in OpenAPI 3.0.
+
+    def get(self, request, *args, **kwargs):
+        since = get_change_cursor(request, default=None)
+        stream = ChangeStream(latest_change_id() if since is None else since)
+        # WSGI servers need a plain iterator; ASGI can stream without a thread.
+        content = aiter(stream) if isinstance(request._request, ASGIRequest) else iter(stream)
+        response = StreamingHttpResponse(content, content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # Do not let nginx buffer events.
+        return response
 
 
 # class UserList(generics.ListCreateAPIView):  # new